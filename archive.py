@@ -0,0 +1,289 @@
+import base64
+import gzip
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from config import ARCHIVE_HOT_DAYS, ARCHIVE_DIR, ARCHIVE_STORAGE, ARCHIVE_INTERVAL, ARCHIVE_GIST_ID
+from database import bot_data, RECORD_TYPES, data_lock, write_gist_file, delete_gist_files, fetch_raw, is_data_loaded
+from leader import is_leader
+from outbox import record_archive
+from search import normalize
+from utils import parse_record_date
+
+# ---------------------------------------------------------
+# 🔹 SEGMENTOS DE ARQUIVO
+# ---------------------------------------------------------
+# Registros mais antigos que ARCHIVE_HOT_DAYS saem de bot_data e vão para
+# segmentos imutáveis (JSON + gzip), gravados em ARCHIVE_DIR e/ou num Gist
+# só de arquivo (ARCHIVE_GIST_ID) — no Gist principal eles seriam baixados
+# em toda leitura do moto_data.json. bot_data["archive"] guarda só o resumo de cada
+# segmento (totais, por mês, faixa de datas) — os segmentos são lidos sob
+# demanda, quando um período pedido no /pdf ou /export precisa deles.
+
+SUMMARY_DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+# Poucos segmentos recentes ficam em memória depois de lidos
+SEGMENT_CACHE_SIZE = 4
+segment_cache = OrderedDict()
+
+def segment_path(segment_id):
+    return os.path.join(ARCHIVE_DIR, f"{segment_id}.json.gz")
+
+
+def gist_filename(segment_id):
+    return f"archive_{segment_id}.json.gz.b64"
+
+
+def uses_gist():
+    """Com ARCHIVE_STORAGE=gist|both o Gist é obrigatório: o disco do container some no redeploy."""
+    return ARCHIVE_STORAGE in ("gist", "both")
+
+
+def write_segment(segment_id, records):
+    """
+    Grava o segmento nos destinos configurados.
+    Retorna (destinos gravados, raw_url do arquivo no Gist ou None); sem
+    destinos quando a gravação obrigatória no Gist falhou.
+    """
+    payload = gzip.compress(json.dumps(records, ensure_ascii=False).encode("utf-8"))
+    storage = []
+    raw_url = None
+
+    if uses_gist():
+        # Nunca no Gist principal (write_gist_file sem id usaria o GIST_ID)
+        if not ARCHIVE_GIST_ID:
+            print(f"❌ Segmento {segment_id} não gravado: ARCHIVE_GIST_ID não configurado")
+            return [], None
+        try:
+            file = write_gist_file(gist_filename(segment_id), base64.b64encode(payload).decode("ascii"), ARCHIVE_GIST_ID)
+        except Exception as e:
+            print(f"❌ Erro ao gravar segmento no Gist {segment_id}: {e}")
+            file = None
+        # O raw_url aponta para esta revisão do arquivo: serve para baixar
+        # só este segmento, sem o resto do Gist
+        if not file or not file.get("raw_url"):
+            return [], None
+        storage.append("gist")
+        raw_url = file["raw_url"]
+
+    if ARCHIVE_STORAGE in ("local", "both"):
+        try:
+            os.makedirs(ARCHIVE_DIR, exist_ok=True)
+            tmp_path = f"{segment_path(segment_id)}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, segment_path(segment_id))
+            storage.append("local")
+        except Exception as e:
+            print(f"❌ Erro ao gravar segmento local {segment_id}: {e}")
+
+    return storage, raw_url
+
+
+def load_segment(summary):
+    """Lê os registros de um segmento (disco local primeiro, depois Gist)."""
+    segment_id = summary["id"]
+    if segment_id in segment_cache:
+        segment_cache.move_to_end(segment_id)
+        return segment_cache[segment_id]
+
+    payload = None
+    if os.path.exists(segment_path(segment_id)):
+        with open(segment_path(segment_id), "rb") as f:
+            payload = f.read()
+    elif "gist" in summary.get("storage", []):
+        content = fetch_raw(summary["raw_url"])
+        if content:
+            payload = base64.b64decode(content)
+
+    if payload is None:
+        print(f"❌ Segmento {segment_id} não encontrado")
+        return []
+
+    records = json.loads(gzip.decompress(payload).decode("utf-8"))
+    segment_cache[segment_id] = records
+    if len(segment_cache) > SEGMENT_CACHE_SIZE:
+        segment_cache.popitem(last=False)
+    return records
+
+
+def iter_archived(tipo, start=None, end=None):
+    """
+    Gera os registros arquivados de `tipo` dentro do período.
+    Só lê os segmentos cuja faixa de datas cruza o período pedido.
+    """
+    for summary in bot_data.get("archive", []):
+        if summary["type"] != tipo:
+            continue
+        first = datetime.strptime(summary["first_date"], SUMMARY_DATE_FORMAT)
+        last = datetime.strptime(summary["last_date"], SUMMARY_DATE_FORMAT)
+        if (start is not None and last < start) or (end is not None and first > end):
+            continue
+
+        for record in load_segment(summary):
+            if start is not None or end is not None:
+                date = parse_record_date(record.get("date"))
+                if date is None or (start is not None and date < start) or (end is not None and date > end):
+                    continue
+            yield record
+
+
+# ---------------------------------------------------------
+# 🔹 RESUMO E ARQUIVAMENTO
+# ---------------------------------------------------------
+def summarize(segment_id, tipo, records, dates, storage):
+    """Resumo pré-calculado do segmento (usado nos totais sem ler o segmento)."""
+    summary = {
+        "id": segment_id,
+        "type": tipo,
+        "count": len(records),
+        "first_date": min(dates).strftime(SUMMARY_DATE_FORMAT),
+        "last_date": max(dates).strftime(SUMMARY_DATE_FORMAT),
+        "storage": storage,
+    }
+
+    if tipo in ("fuel", "manu"):
+        by_month = {}
+        for record, date in zip(records, dates):
+            month_key = f"{date.year}-{date.month:02d}"
+            by_month[month_key] = round(by_month.get(month_key, 0.0) + record.get("price", 0.0), 2)
+        summary["total_price"] = round(sum(record.get("price", 0.0) for record in records), 2)
+        summary["by_month"] = by_month
+
+    if tipo == "fuel":
+        summary["total_liters"] = round(sum(record["liters"] for record in records), 2)
+
+    if tipo in ("km", "manu"):
+        summary["min_km"] = min(record["km"] for record in records)
+        summary["max_km"] = max(record["km"] for record in records)
+
+    if tipo == "manu":
+        oil = [record["km"] for record in records if "oleo" in normalize(record["desc"])]
+        summary["last_oil_km"] = oil[-1] if oil else 0
+
+    return summary
+
+
+def select_cold(tipo, horizon):
+    """Registros de `tipo` anteriores ao horizonte (o último KM fica sempre em memória)."""
+    records = bot_data[tipo][:-1] if tipo == "km" else bot_data[tipo]
+    cold = []
+    for record in records:
+        date = parse_record_date(record.get("date"))
+        if date is not None and date < horizon:
+            cold.append((record, date))
+    return cold
+
+
+def archive_old_records(now=None):
+    """
+    Move para um novo segmento, por tipo, os registros mais antigos que
+    ARCHIVE_HOT_DAYS. Retorna quantos registros foram arquivados.
+    """
+    if ARCHIVE_HOT_DAYS <= 0:
+        return 0
+
+    horizon = (now or datetime.now()) - timedelta(days=ARCHIVE_HOT_DAYS)
+    archived = 0
+
+    # A gravação dos segmentos (Gist) roda sem data_lock: a trava fica só
+    # na escolha dos registros e na troca das listas
+    with data_lock:
+        candidates = [(tipo, select_cold(tipo, horizon)) for tipo in RECORD_TYPES]
+
+    for tipo, cold in candidates:
+        if not cold:
+            continue
+
+        records = [record for record, date in cold]
+        dates = [date for record, date in cold]
+        segment_id = f"{tipo}-{min(dates):%Y%m%d}-{max(dates):%Y%m%d}-{uuid.uuid4().hex[:8]}"
+
+        storage, raw_url = write_segment(segment_id, records)
+        if not storage:
+            print(f"❌ Segmento {segment_id} não gravado, registros mantidos em memória")
+            continue
+
+        summary = summarize(segment_id, tipo, records, dates, storage)
+        if "gist" in storage:
+            summary["gist_id"] = ARCHIVE_GIST_ID
+            summary["raw_url"] = raw_url
+
+        cold_ids = {id(record) for record in records}
+        with data_lock:
+            # Registro apagado (/del, /delete) ou dados recarregados durante
+            # a gravação: o segmento não vale mais, tenta de novo na próxima volta
+            stale = not cold_ids <= {id(record) for record in bot_data[tipo]}
+            if not stale:
+                bot_data[tipo] = [record for record in bot_data[tipo] if id(record) not in cold_ids]
+                bot_data.setdefault("archive", []).append(summary)
+                record_archive(tipo, summary, records)
+
+        if stale:
+            print(f"⚠️ Segmento {segment_id} descartado: registros alterados durante a gravação")
+            delete_segments([summary])
+            continue
+
+        archived += len(records)
+        print(f"🗄️ {len(records)} registros de {tipo} arquivados em {segment_id} ({', '.join(storage)})")
+
+    return archived
+
+
+def delete_segments(summaries):
+    """
+    Apaga os arquivos dos segmentos (disco local e Gist), ex: no /delete.
+    Retorna quantos segmentos não puderam ser apagados.
+    """
+    failed = set()
+    by_gist = {}
+
+    for summary in summaries:
+        segment_cache.pop(summary["id"], None)
+        try:
+            if os.path.exists(segment_path(summary["id"])):
+                os.remove(segment_path(summary["id"]))
+        except Exception as e:
+            print(f"❌ Erro ao apagar segmento local {summary['id']}: {e}")
+            failed.add(summary["id"])
+        if "gist" in summary.get("storage", []):
+            by_gist.setdefault(summary["gist_id"], []).append(summary["id"])
+
+    for gist_id, segment_ids in by_gist.items():
+        try:
+            ok = delete_gist_files([gist_filename(segment_id) for segment_id in segment_ids], gist_id)
+        except Exception as e:
+            print(f"❌ Erro ao apagar segmentos no Gist: {e}")
+            ok = False
+        if not ok:
+            failed.update(segment_ids)
+
+    return len(failed)
+
+
+def archive_scheduler():
+    """
+    Arquiva registros antigos periodicamente (a cada ARCHIVE_INTERVAL segundos)
+    Só o líder arquiva, e só depois que os dados foram carregados do Gist
+    """
+    if ARCHIVE_HOT_DAYS <= 0:
+        return
+
+    if uses_gist() and not ARCHIVE_GIST_ID:
+        print("❌ Arquivamento desativado: configure ARCHIVE_GIST_ID ou use ARCHIVE_STORAGE=local")
+        return
+
+    print(f"🗄️ Arquivamento ativo: registros com mais de {ARCHIVE_HOT_DAYS} dias")
+
+    while True:
+        try:
+            if is_leader() and is_data_loaded():
+                archive_old_records()
+        except Exception as e:
+            print(f"❌ Erro no arquivamento: {e}")
+        time.sleep(ARCHIVE_INTERVAL)
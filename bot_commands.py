@@ -1,271 +1,532 @@
-from database import bot_data, save_to_gist
-from utils import send_message, format_date, get_last_km, check_oil_change_alert, send_document, get_last_oil_change
-from reports import generate_report, generate_pdf
+from database import bot_data, RECORD_TYPES, data_lock, snapshot_data
+from outbox import record_add, record_remove, record_clear, record_batch
+import search
+import profiler
+from data_io import iter_rows, parse_import, merge_records, drop_archived, parse_period, parse_export_args, iter_records, write_export
+from archive import iter_archived, delete_segments, SUMMARY_DATE_FORMAT
+from utils import send_message, format_date, get_last_km, check_oil_change_alert, send_document, get_last_oil_change, download_file, edit_message_text, archived_segments
+from reports import generate_report, generate_pdf, generate_history_page
 from config import DELETE_PASSWORD, NOTIFICATION_CHAT_ID
+from router import command, callback, dispatch, TEXT, STRICT
 import pytz
 from datetime import datetime
 
+# Limite de download de arquivos da API de bots do Telegram
+MAX_IMPORT_SIZE = 20 * 1024 * 1024
+
+# Resposta quando nem a outbox local conseguiu registrar a alteração
+PERSIST_ERROR = "⚠️ Não foi possível registrar a alteração em disco. Ela será perdida se o bot reiniciar antes de salvar no Gist."
+
 def process_command(update):
     """
     Processa comandos recebidos do Telegram
-    Gerencia todos os comandos disponíveis no bot
+    O despacho é feito pelo registro de comandos (router.py)
     """
     try:
-        message = update.get("message", {})
-        chat_id = message.get("chat", {}).get("id")
-        text = message.get("text", "")
-        
-        if not chat_id or not text:
-            return
-        
-        print(f"📨 Comando: {text}")
-        
-        # Comando /start - Menu principal
-        if text.startswith("/start"):
-            send_message(chat_id,
-                "🏍️ *BOT MANUTENÇÃO - POPzinha*\n\n"
-                "📊 *REGISTROS:*\n"
-                "• /addkm KMsAtuais — Define os KMs Atuais\n"
-                "• /fuel Litros Valor — Registra abastecimento\n"
-                "• /manu Descrição Preço KM — Registra manutenção\n\n"
-                "📋 *CONSULTAS:*\n"
-                "• /report — Resumo geral (últimos 5 registros)\n"
-                "• /pdf — Gera relatório completo em PDF\n"
-                "• /statusoleo — Status da troca de óleo\n\n"
-                "⚙️ *GERENCIAMENTO:*\n"
-                "• /del km Índice — Deleta KM\n"
-                "• /del fuel Índice — Deleta abastecimento\n"
-                "• /del manu Índice — Deleta manutenção\n\n"
-                "🔔 *ALERTAS:*\n"
-                "• Alertas automáticos para troca de óleo\n"
-                "💡 *Dica:* Clique e segure nos comandos para usar!"
-            )
-        
-        # Comando /delete - Apaga todos os dados (com senha)
-        elif text.startswith("/delete"):
-            try:
-                parts = text.split()
-                if len(parts) >= 2:
-                    password = parts[1]
-                    
-                    if password == DELETE_PASSWORD:
-                        # Confirmar antes de deletar tudo
-                        total_km = len(bot_data["km"])
-                        total_fuel = len(bot_data["fuel"])
-                        total_manu = len(bot_data["manu"])
-                        
-                        # Limpar todos os dados
-                        bot_data["km"] = []
-                        bot_data["fuel"] = []
-                        bot_data["manu"] = []
-                        
-                        if save_to_gist(bot_data):
-                            send_message(chat_id, f"🗑️🚨 *TODOS OS DADOS FORAM DELETADOS!*\n\n"
-                                                f"• {total_km} registros de KM removidos\n"
-                                                f"• {total_fuel} abastecimentos removidos\n"
-                                                f"• {total_manu} manutenções removidas\n\n"
-                                                f"*SISTEMA REINICIADO*")
-                        else:
-                            send_message(chat_id, "❌ Erro ao salvar dados deletados no Gist")
-                    else:
-                        send_message(chat_id, "❌ Senha incorreta! Operação cancelada.")
-                else:
-                    send_message(chat_id, "❌ Use: `/delete SENHA`\n\n⚠️ *ATENÇÃO:* Este comando apaga TODOS os dados permanentemente!")
-            except Exception as e:
-                print(f"❌ Erro no /delete: {e}")
-                send_message(chat_id, "❌ Use: `/delete SENHA`")
-        
-        # Comando /addkm - Registra novo quilometragem
-        elif text.startswith("/addkm"):
-            try:
-                km_value = int(text.split()[1])
-                last_km = get_last_km()
-                if km_value == last_km:
-                    send_message(chat_id, f"⚠️ KM {km_value} já é o último registrado")
-                else:
-                    bot_data["km"].append({"km": km_value, "date": format_date()})
-                    save_to_gist(bot_data)
-                    send_message(chat_id, f"✅ KM registrado: {km_value} km")
-
-                    send_message(chat_id, generate_report())
-                    
-                    # Verificar alerta de troca de óleo
-                    alert_msg = check_oil_change_alert(km_value)
-                    if alert_msg:
-                        send_message(chat_id, alert_msg)
-                    
-            except:
-                send_message(chat_id, "❌ Use: `/addkm 15000`")
-        
-        # Comando /fuel - Registra abastecimento
-        elif text.startswith("/fuel"):
-            try:
-                parts = text.split()
-                liters = float(parts[1])
-                price = float(parts[2])
-                bot_data["fuel"].append({"liters": liters, "price": price, "date": format_date()})
-                save_to_gist(bot_data)
-                send_message(chat_id, f"⛽ Abastecimento: {liters}L a R$ {price:.2f}")
-                send_message(chat_id, generate_report())
-                
-                # Verificar alerta de troca de óleo
-                current_km = get_last_km()
-                alert_msg = check_oil_change_alert(current_km)
-                if alert_msg:
-                    send_message(chat_id, alert_msg)
-                        
-            except:
-                send_message(chat_id, "❌ Use: `/fuel 10 5.50`")
-        
-        # Comando /manu - Registra manutenção (CÓDIGO CORRIGIDO)
-        elif text.startswith("/manu"):
-            try:
-                parts = text.split()
-                if len(parts) >= 4:  # Agora precisa de pelo menos 4 partes: /manu descrição preço km
-                    # Último é KM, penúltimo é preço, o resto é descrição
-                    km_value = int(parts[-1])
-                    price = float(parts[-2])
-                    desc = " ".join(parts[1:-2])  # Tudo entre /manu e o preço
-                    
-                    last_km = get_last_km()
-                    
-                    # VERIFICAR SE KM JÁ EXISTE (CORREÇÃO APLICADA)
-                    km_exists = any(registro["km"] == km_value for registro in bot_data["km"])
-                    km_added = False
-                    
-                    # Adiciona KM apenas se for diferente do último E não existir ainda
-                    if km_value != last_km and not km_exists:
-                        bot_data["km"].append({"km": km_value, "date": format_date()})
-                        km_added = True
-                    elif km_value != last_km and km_exists:
-                        # KM já existe em outro registro, não adicionar novo
-                        km_added = False
-                    
-                    # Registrar manutenção COM PREÇO
-                    bot_data["manu"].append({
-                        "desc": desc, 
-                        "date": format_date(),
-                        "km": km_value,
-                        "price": price
-                    })
-                    
-                    save_to_gist(bot_data)
-                    
-                    # Mensagem de confirmação
-                    if km_added:
-                        send_message(chat_id, f"🧰 Manutenção registrada: {desc} | R$ {price:.2f} | {km_value} Km\n✅ KM registrado automaticamente")
-                    elif km_exists:
-                        send_message(chat_id, f"🧰 Manutenção registrada: {desc} | R$ {price:.2f} | {km_value} Km\nℹ️ KM já estava registrado anteriormente")
-                    else:
-                        send_message(chat_id, f"🧰 Manutenção registrada: {desc} | R$ {price:.2f} | {km_value} Km\nℹ️ KM já era o último registrado")
-
-                    send_message(chat_id, generate_report())
-            
-                    # Verificar se é troca de óleo
-                    oil_keywords = ['óleo', 'oleo', 'OLEO', 'ÓLEO', 'Óleo']
-                    if any(keyword.lower() in desc.lower() for keyword in oil_keywords):
-                        send_message(chat_id, "🔧 *TROCA DE ÓLEO REGISTRADA! PRÓXIMO ALERTA EM 1000KM*")
-                    else:
-                        # Verificar alerta de troca de óleo
-                        current_km = get_last_km()
-                        alert_msg = check_oil_change_alert(current_km)
-                        if alert_msg:
-                            send_message(chat_id, alert_msg)
-                else:
-                    send_message(chat_id, "❌ Use: `/manu Descrição Preço KM`\nEx: `/manu Troca de óleo 50 15000`")
-            except:
-                send_message(chat_id, "❌ Use: `/manu Descrição Preço KM`\nEx: `/manu Troca de óleo 50 15000`")
-        
-        # Comando /report - Gera relatório resumido
-        elif text.startswith("/report"):
-            # Mostrar status da troca de óleo antes do report
-            current_km = get_last_km()
-            if current_km > 0:
-                alert_msg = check_oil_change_alert(current_km)
-                if alert_msg:
-                    send_message(chat_id, alert_msg)
-            #Envia o report
-            send_message(chat_id, generate_report())
-        
-        # Comando /pdf - Gera e envia PDF completo
-        elif text.startswith("/pdf"):
-            send_message(chat_id, "📄 Gerando relatório completo em PDF...")
-            pdf_buffer = generate_pdf()
-            if pdf_buffer:
-                # Nome do arquivo com data
-                data_arquivo = datetime.now().strftime("%Y%m%d_%H%M")
-                filename = f"relatorio_moto_{data_arquivo}.pdf"
-                
-                if send_document(chat_id, pdf_buffer, filename):
-                    send_message(chat_id, "✅ PDF enviado com sucesso!")
-                else:
-                    send_message(chat_id, "❌ Erro ao enviar PDF")
-            else:
-                send_message(chat_id, "❌ Erro ao gerar PDF")
-        
-        # Comando /del - Deleta registros individuais
-        elif text.startswith("/del"):
-            try:
-                parts = text.split()
-                if len(parts) >= 3:
-                    tipo = parts[1]
-                    index = int(parts[2]) - 1
-                    
-                    if tipo in bot_data and 0 <= index < len(bot_data[tipo]):
-                        bot_data[tipo].pop(index)
-                        save_to_gist(bot_data)
-                        send_message(chat_id, f"🗑️ Registro removido!")
-                        send_message(chat_id, generate_report())
-                    else:
-                        send_message(chat_id, f"❌ Índice inválido para {tipo}. Use de 1 a {len(bot_data.get(tipo, []))}")
-                else:
-                    if len(parts) == 2:
-                        tipo = parts[1]
-                        if tipo in bot_data:
-                            send_message(chat_id, f"❌ Use: `/del {tipo} 1`")
-                        else:
-                            send_message(chat_id, "❌ Tipo inválido. Use: km, fuel ou manu")
-                    else:
-                        send_message(chat_id, "❌ Use: `/del km 1` ou `/del fuel 1` ou `/del manu 1`")
-            except Exception as e:
-                print(f"❌ Erro no /del: {e}")
-                send_message(chat_id, "❌ Use: `/del km 1` ou `/del fuel 1` ou `/del manu 1`")
-        
-        # Comando /statusoleo - Mostra status completo do óleo
-        elif text.startswith("/statusoleo"):
-            try:
-                current_km = get_last_km()
-                last_oil_km = get_last_oil_change()
-                
-                if last_oil_km == 0:
-                    send_message(chat_id, "⚠️ *STATUS ÓLEO:* Nenhuma troca de óleo registrada ainda!")
-                    return
-                
-                km_since_last_oil = current_km - last_oil_km
-                km_remaining = 1000 - km_since_last_oil
-                
-                status_msg = f"⚪ *STATUS ÓLEO* ⚪\n\n"
-                status_msg += f"📏 *KM Atual:* {current_km} km\n"
-                status_msg += f"🛢️ *Última Troca:* {last_oil_km} km\n"
-                status_msg += f"🛣️ *KM Rodados:* {km_since_last_oil} km\n"
-                status_msg += f"🎯 *KM Restantes:* {km_remaining} km\n\n"
-                
-                # Adicionar alerta baseado na situação
-                if km_since_last_oil >= 1000:
-                    status_msg += f"🚨 *SITUAÇÃO:* TROCA URGENTE! Já passou {km_since_last_oil}km"
-                elif km_remaining <= 100:
-                    status_msg += f"🔴 *SITUAÇÃO:* ALERTA CRÍTICO! Faltam {km_remaining}km"
-                elif km_remaining <= 300:
-                    status_msg += f"🟡 *SITUAÇÃO:* ALERTA! Faltam {km_remaining}km"
-                elif km_remaining <= 500:
-                    status_msg += f"🔵 *SITUAÇÃO:* LEMBRETE! Faltam {km_remaining}km"
-                else:
-                    status_msg += f"✅ *SITUAÇÃO:* Tudo em ordem! Próxima troca em {km_remaining}km"
-                
-                send_message(chat_id, status_msg)
-                
-            except Exception as e:
-                send_message(chat_id, f"❌ Erro ao verificar status do óleo: {e}")
-            
+        dispatch(update)
     except Exception as e:
         print(f"❌ Erro: {e}")
+
+# Comando /start - Menu principal
+@command("/start")
+def cmd_start(ctx):
+    ctx.reply(
+        "🏍️ *BOT MANUTENÇÃO - POPzinha*\n\n"
+        "📊 *REGISTROS:*\n"
+        "• /addkm KMsAtuais — Define os KMs Atuais\n"
+        "• /fuel Litros Valor — Registra abastecimento\n"
+        "• /manu Descrição Preço KM — Registra manutenção\n"
+        "• /import — Importa histórico (envie CSV/JSON com essa legenda)\n\n"
+        "📋 *CONSULTAS:*\n"
+        "• /report — Resumo geral (últimos 5 registros)\n"
+        "• /pdf [período] — Gera relatório completo em PDF\n"
+        "• /hist km|fuel|manu — Navega pelo histórico\n"
+        "• /statusoleo — Status da troca de óleo\n"
+        "• /buscar termo — Busca nas manutenções (ex: /buscar corrente)\n"
+        "• /export csv|json [período] [gz] — Exporta os dados\n\n"
+        "⚙️ *GERENCIAMENTO:*\n"
+        "• /del km Índice — Deleta KM\n"
+        "• /del fuel Índice — Deleta abastecimento\n"
+        "• /del manu Índice — Deleta manutenção\n\n"
+        "🔔 *ALERTAS:*\n"
+        "• Alertas automáticos para troca de óleo\n"
+        "• /subscribe — Recebe os alertas diários neste chat\n"
+        "• /unsubscribe — Para de receber os alertas\n"
+        "💡 *Dica:* Clique e segure nos comandos para usar!"
+    )
+
+# Comando /delete - Apaga todos os dados (com senha)
+@command("/delete", args=[("password", str)], admin=True,
+         usage="❌ Use: `/delete SENHA`\n\n⚠️ *ATENÇÃO:* Este comando apaga TODOS os dados permanentemente!")
+def cmd_delete(ctx):
+    if ctx.args["password"] != DELETE_PASSWORD:
+        ctx.reply("❌ Senha incorreta! Operação cancelada.")
+        return
+
+    with data_lock:
+        # Confirmar antes de deletar tudo
+        total_km = len(bot_data["km"])
+        total_fuel = len(bot_data["fuel"])
+        total_manu = len(bot_data["manu"])
+        segments = bot_data.get("archive", [])
+        total_archived = sum(summary["count"] for summary in segments)
+
+        # Limpar todos os dados
+        bot_data["km"] = []
+        bot_data["fuel"] = []
+        bot_data["manu"] = []
+        bot_data["archive"] = []
+        persisted = record_clear()
+
+    # Arquivos dos segmentos (disco/Gist) apagados fora da trava
+    failed_segments = delete_segments(segments)
+
+    if persisted:
+        msg = (f"🗑️🚨 *TODOS OS DADOS FORAM DELETADOS!*\n\n"
+               f"• {total_km} registros de KM removidos\n"
+               f"• {total_fuel} abastecimentos removidos\n"
+               f"• {total_manu} manutenções removidas\n")
+        if total_archived:
+            msg += f"• {total_archived} registros arquivados removidos\n"
+        if failed_segments:
+            msg += f"\n⚠️ {failed_segments} segmento(s) de arquivo não puderam ser apagados e continuam guardados\n"
+        msg += "\n*SISTEMA REINICIADO*"
+        ctx.reply(msg)
+    else:
+        ctx.reply(PERSIST_ERROR)
+
+# Comando /addkm - Registra novo quilometragem
+@command("/addkm", args=[("km", int)], usage="❌ Use: `/addkm 15000`")
+def cmd_addkm(ctx):
+    km_value = ctx.args["km"]
+    with data_lock:
+        if km_value == get_last_km():
+            persisted = None
+        else:
+            record = {"km": km_value, "date": format_date()}
+            bot_data["km"].append(record)
+            persisted = record_add("km", record)
+            report = generate_report()
+            # Verificar alerta de troca de óleo
+            alert_msg = check_oil_change_alert(km_value)
+
+    if persisted is None:
+        ctx.reply(f"⚠️ KM {km_value} já é o último registrado")
+        return
+
+    if not persisted:
+        ctx.reply(PERSIST_ERROR)
+    ctx.reply(f"✅ KM registrado: {km_value} km")
+
+    ctx.reply(report)
+
+    if alert_msg:
+        ctx.reply(alert_msg)
+
+# Comando /fuel - Registra abastecimento
+@command("/fuel", args=[("liters", float), ("price", float)], usage="❌ Use: `/fuel 10 5.50`")
+def cmd_fuel(ctx):
+    liters = ctx.args["liters"]
+    price = ctx.args["price"]
+    record = {"liters": liters, "price": price, "date": format_date()}
+    with data_lock:
+        bot_data["fuel"].append(record)
+        persisted = record_add("fuel", record)
+        report = generate_report()
+        # Verificar alerta de troca de óleo
+        alert_msg = check_oil_change_alert(get_last_km())
+
+    if not persisted:
+        ctx.reply(PERSIST_ERROR)
+    ctx.reply(f"⛽ Abastecimento: {liters}L a R$ {price:.2f}")
+    ctx.reply(report)
+
+    if alert_msg:
+        ctx.reply(alert_msg)
+
+# Comando /manu - Registra manutenção
+# Último é KM, penúltimo é preço, o resto é descrição
+@command("/manu", args=[("desc", TEXT), ("price", float), ("km", int)],
+         usage="❌ Use: `/manu Descrição Preço KM`\nEx: `/manu Troca de óleo 50 15000`")
+def cmd_manu(ctx):
+    km_value = ctx.args["km"]
+    price = ctx.args["price"]
+    desc = ctx.args["desc"]
+
+    # Verificar se é troca de óleo
+    oil_keywords = ['óleo', 'oleo', 'OLEO', 'ÓLEO', 'Óleo']
+    is_oil_change = any(keyword.lower() in desc.lower() for keyword in oil_keywords)
+
+    with data_lock:
+        last_km = get_last_km()
+
+        # VERIFICAR SE KM JÁ EXISTE
+        km_exists = any(registro["km"] == km_value for registro in bot_data["km"])
+        km_added = False
+        persisted = True
+
+        # Adiciona KM apenas se for diferente do último E não existir ainda
+        if km_value != last_km and not km_exists:
+            km_record = {"km": km_value, "date": format_date()}
+            bot_data["km"].append(km_record)
+            persisted = record_add("km", km_record)
+            km_added = True
+
+        # Registrar manutenção COM PREÇO
+        record = {
+            "desc": desc,
+            "date": format_date(),
+            "km": km_value,
+            "price": price
+        }
+        bot_data["manu"].append(record)
+        search.add_record(record)
+        persisted = record_add("manu", record) and persisted
+
+        report = generate_report()
+        # Verificar alerta de troca de óleo
+        alert_msg = None if is_oil_change else check_oil_change_alert(get_last_km())
+
+    if not persisted:
+        ctx.reply(PERSIST_ERROR)
+
+    # Mensagem de confirmação
+    if km_added:
+        ctx.reply(f"🧰 Manutenção registrada: {desc} | R$ {price:.2f} | {km_value} Km\n✅ KM registrado automaticamente")
+    elif km_exists:
+        ctx.reply(f"🧰 Manutenção registrada: {desc} | R$ {price:.2f} | {km_value} Km\nℹ️ KM já estava registrado anteriormente")
+    else:
+        ctx.reply(f"🧰 Manutenção registrada: {desc} | R$ {price:.2f} | {km_value} Km\nℹ️ KM já era o último registrado")
+
+    ctx.reply(report)
+
+    if is_oil_change:
+        ctx.reply("🔧 *TROCA DE ÓLEO REGISTRADA! PRÓXIMO ALERTA EM 1000KM*")
+    elif alert_msg:
+        ctx.reply(alert_msg)
+
+# Comando /report - Gera relatório resumido
+@command("/report")
+def cmd_report(ctx):
+    with data_lock:
+        current_km = get_last_km()
+        alert_msg = check_oil_change_alert(current_km) if current_km > 0 else None
+        report = generate_report()
+
+    # Mostrar status da troca de óleo antes do report
+    if alert_msg:
+        ctx.reply(alert_msg)
+    #Envia o report
+    ctx.reply(report)
+
+# Comando /pdf - Gera e envia PDF completo (opcionalmente de um período)
+@command("/pdf", usage="❌ Use: `/pdf` ou `/pdf 01/01/25-31/12/25`")
+def cmd_pdf(ctx):
+    start, end = parse_period(ctx.args)
+    ctx.reply("📄 Gerando relatório completo em PDF...")
+    # generate_pdf segura data_lock só enquanto copia os dados
+    pdf_buffer = generate_pdf(start, end)
+    if pdf_buffer:
+        # Nome do arquivo com data
+        data_arquivo = datetime.now().strftime("%Y%m%d_%H%M")
+        filename = f"relatorio_moto_{data_arquivo}.pdf"
+
+        if send_document(ctx.chat_id, pdf_buffer, filename):
+            ctx.reply("✅ PDF enviado com sucesso!")
+        else:
+            ctx.reply("❌ Erro ao enviar PDF")
+    else:
+        ctx.reply("❌ Erro ao gerar PDF")
+
+# Comando /del - Deleta registros individuais
+@command("/del", args=[("tipo", str), ("index", int, None)],
+         usage="❌ Use: `/del km 1` ou `/del fuel 1` ou `/del manu 1`")
+def cmd_del(ctx):
+    tipo = ctx.args["tipo"]
+    if tipo not in RECORD_TYPES:
+        ctx.reply("❌ Tipo inválido. Use: km, fuel ou manu")
+        return
+    if ctx.args["index"] is None:
+        ctx.reply(f"❌ Use: `/del {tipo} 1`")
+        return
+
+    index = ctx.args["index"] - 1
+    with data_lock:
+        valid = 0 <= index < len(bot_data[tipo])
+        if valid:
+            removed = bot_data[tipo].pop(index)
+            if tipo == "manu":
+                search.remove_record(removed)
+            persisted = record_remove(tipo, removed)
+            report = generate_report()
+        total = len(bot_data[tipo])
+
+    if not valid:
+        ctx.reply(f"❌ Índice inválido para {tipo}. Use de 1 a {total}")
+        return
+
+    if not persisted:
+        ctx.reply(PERSIST_ERROR)
+    ctx.reply(f"🗑️ Registro removido!")
+    ctx.reply(report)
+
+# Comando /statusoleo - Mostra status completo do óleo
+@command("/statusoleo")
+def cmd_statusoleo(ctx):
+    try:
+        with data_lock:
+            current_km = get_last_km()
+            last_oil_km = get_last_oil_change()
+
+        if last_oil_km == 0:
+            ctx.reply("⚠️ *STATUS ÓLEO:* Nenhuma troca de óleo registrada ainda!")
+            return
+
+        km_since_last_oil = current_km - last_oil_km
+        km_remaining = 1000 - km_since_last_oil
+
+        status_msg = f"⚪ *STATUS ÓLEO* ⚪\n\n"
+        status_msg += f"📏 *KM Atual:* {current_km} km\n"
+        status_msg += f"🛢️ *Última Troca:* {last_oil_km} km\n"
+        status_msg += f"🛣️ *KM Rodados:* {km_since_last_oil} km\n"
+        status_msg += f"🎯 *KM Restantes:* {km_remaining} km\n\n"
+
+        # Adicionar alerta baseado na situação
+        if km_since_last_oil >= 1000:
+            status_msg += f"🚨 *SITUAÇÃO:* TROCA URGENTE! Já passou {km_since_last_oil}km"
+        elif km_remaining <= 100:
+            status_msg += f"🔴 *SITUAÇÃO:* ALERTA CRÍTICO! Faltam {km_remaining}km"
+        elif km_remaining <= 300:
+            status_msg += f"🟡 *SITUAÇÃO:* ALERTA! Faltam {km_remaining}km"
+        elif km_remaining <= 500:
+            status_msg += f"🔵 *SITUAÇÃO:* LEMBRETE! Faltam {km_remaining}km"
+        else:
+            status_msg += f"✅ *SITUAÇÃO:* Tudo em ordem! Próxima troca em {km_remaining}km"
+
+        ctx.reply(status_msg)
+
+    except Exception as e:
+        ctx.reply(f"❌ Erro ao verificar status do óleo: {e}")
+
+# Comando /import - Importa histórico a partir de um arquivo CSV/JSON
+IMPORT_USAGE = (
+    "📥 *IMPORTAR HISTÓRICO*\n\n"
+    "Envie um arquivo .csv, .json ou .jsonl com a legenda `/import`\n"
+    "(ou responda ao arquivo com `/import`).\n\n"
+    "Colunas: `type,date,km,liters,price,desc`\n"
+    "• `km,18/02/25,15000,,,`\n"
+    "• `fuel,18/02/25,,10,55.00,`\n"
+    "• `manu,20/02/25,15100,,50,Troca de óleo`"
+)
+
+@command("/import", usage=IMPORT_USAGE)
+def cmd_import(ctx):
+    document = ctx.message.get("document") or ctx.message.get("reply_to_message", {}).get("document")
+    if not document:
+        ctx.reply(IMPORT_USAGE)
+        return
+
+    if document.get("file_size", 0) > MAX_IMPORT_SIZE:
+        ctx.reply("❌ Arquivo maior que 20MB. Divida em partes menores.")
+        return
+
+    response = download_file(document["file_id"])
+    if response is None:
+        ctx.reply("❌ Erro ao baixar o arquivo")
+        return
+
+    response.encoding = "utf-8-sig"
+    try:
+        lines = response.iter_lines(decode_unicode=True)
+        batch, errors, error_count, total = parse_import(iter_rows(lines, document.get("file_name")))
+    except Exception as e:
+        ctx.reply(f"❌ Não foi possível ler o arquivo: {e}")
+        return
+    finally:
+        response.close()
+
+    if errors:
+        msg = f"❌ *IMPORTAÇÃO CANCELADA* — {error_count} linha(s) com erro de {total}\n\n"
+        msg += "\n".join(f"• Linha {line}: {error}" for line, error in errors)
+        if error_count > len(errors):
+            msg += f"\n• ... e mais {error_count - len(errors)}"
+        ctx.reply(msg)
+        return
+
+    if total == 0:
+        ctx.reply("⚠️ Nenhum registro encontrado no arquivo")
+        return
+
+    # Registros já arquivados também contam como existentes; o lote que vai
+    # para a outbox fica sem eles, para a reaplicação não os trazer de volta
+    with data_lock:
+        drop_archived(batch, iter_archived)
+        added = merge_records(bot_data, batch)
+        persisted = record_batch(batch)
+
+    ignored = total - sum(added.values())
+    msg = f"📥 *IMPORTAÇÃO CONCLUÍDA* — {total} linhas\n\n"
+    msg += f"• {added['km']} registros de KM\n"
+    msg += f"• {added['fuel']} abastecimentos\n"
+    msg += f"• {added['manu']} manutenções\n"
+    if ignored:
+        msg += f"• {ignored} já existentes (ignorados)\n"
+    if not persisted:
+        msg += f"\n{PERSIST_ERROR}"
+    ctx.reply(msg)
+
+# Comando /export - Exporta os registros em CSV/JSON Lines
+@command("/export", usage="❌ Use: `/export csv|json [DD/MM/AA-DD/MM/AA] [gz]`\nEx: `/export csv 01/01/25-31/12/25`")
+def cmd_export(ctx):
+    fmt, start, end, gz = parse_export_args(ctx.args)
+
+    # Cópia sob a trava; segmentos arquivados (que podem vir do Gist) são
+    # lidos depois, sem ela
+    with data_lock:
+        data = snapshot_data()
+    export_file, count = write_export(iter_records(data, start, end, iter_archived), fmt, gz)
+    try:
+        if count == 0:
+            ctx.reply("⚠️ Nenhum registro no período informado")
+            return
+
+        data_arquivo = datetime.now().strftime("%Y%m%d_%H%M")
+        extension = "csv" if fmt == "csv" else "jsonl"
+        mime_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        filename = f"moto_export_{data_arquivo}.{extension}"
+        if gz:
+            filename += ".gz"
+            mime_type = "application/gzip"
+
+        if send_document(ctx.chat_id, export_file, filename, mime_type):
+            ctx.reply(f"✅ Exportação enviada: {count} registros")
+        else:
+            ctx.reply("❌ Erro ao enviar exportação")
+    finally:
+        export_file.close()
+
+# Comando /hist - Histórico paginado com botões de navegação
+@command("/hist", args=[("tipo", str, "manu"), ("page", int, 1)],
+         usage="❌ Use: `/hist manu` ou `/hist fuel 2` ou `/hist km`")
+def cmd_hist(ctx):
+    tipo = ctx.args["tipo"].lower()
+    if tipo not in RECORD_TYPES:
+        ctx.reply(ctx.command.usage)
+        return
+
+    with data_lock:
+        text, keyboard = generate_history_page(tipo, ctx.args["page"])
+    send_message(ctx.chat_id, text, keyboard)
+
+# Botões do /hist - edita a própria mensagem com a nova página
+# (o clique é respondido pelo router.dispatch_callback)
+@callback("hist", args=[("tipo", str), ("page", int)])
+def callback_hist(ctx):
+    tipo = ctx.args["tipo"]
+    if tipo in RECORD_TYPES:
+        with data_lock:
+            text, keyboard = generate_history_page(tipo, ctx.args["page"])
+        edit_message_text(ctx.chat_id, ctx.message.get("message_id"), text, keyboard)
+
+# Comando /subscribe - Inscreve o chat nos alertas diários
+@command("/subscribe")
+def cmd_subscribe(ctx):
+    with data_lock:
+        subscribers = bot_data.setdefault("subscribers", [])
+        already = ctx.chat_id in subscribers
+        if not already:
+            subscribers.append(ctx.chat_id)
+            persisted = record_add("subscribers", ctx.chat_id)
+
+    if already:
+        ctx.reply("ℹ️ Este chat já recebe os alertas diários")
+        return
+
+    if not persisted:
+        ctx.reply(PERSIST_ERROR)
+    ctx.reply("🔔 Inscrição feita! Este chat vai receber os alertas de manutenção às 8:00 e 20:00")
+
+# Comando /unsubscribe - Remove o chat dos alertas diários
+@command("/unsubscribe")
+def cmd_unsubscribe(ctx):
+    with data_lock:
+        subscribers = bot_data.setdefault("subscribers", [])
+        subscribed = ctx.chat_id in subscribers
+        if subscribed:
+            subscribers.remove(ctx.chat_id)
+            persisted = record_remove("subscribers", ctx.chat_id)
+
+    if not subscribed:
+        ctx.reply("ℹ️ Este chat não está inscrito nos alertas")
+        return
+
+    if not persisted:
+        ctx.reply(PERSIST_ERROR)
+    ctx.reply("🔕 Inscrição cancelada. Use /subscribe para voltar a receber os alertas")
+
+# Comando /buscar - Busca nas descrições das manutenções
+SEARCH_LIMIT = 20
+
+@command("/buscar", args=[("query", TEXT)], usage="❌ Use: `/buscar termo`\nEx: `/buscar oleo` ou `/buscar pneu tras`")
+def cmd_buscar(ctx):
+    query = ctx.args["query"]
+    with data_lock:
+        results = search.search(query)
+        segments = archived_segments("manu")
+
+    # A busca só vê as manutenções em memória: avisa quando há arquivadas
+    archived_note = ""
+    if segments:
+        archived = sum(segment["count"] for segment in segments)
+        until = datetime.strptime(max(segment["last_date"] for segment in segments), SUMMARY_DATE_FORMAT)
+        archived_note = (f"\n\n📦 {archived} manutenções arquivadas (até {until.strftime('%d/%m/%y')}) "
+                         f"não entram na busca nem no total")
+
+    if not results:
+        ctx.reply(f"🔎 Nenhuma manutenção encontrada para: {query}{archived_note}")
+        return
+
+    total = sum(item.get('price', 0.0) for item in results)
+    msg = f"🔎 *BUSCA:* {query} — {len(results)} resultado(s)\n\n"
+    # Mais recentes (maior KM) primeiro
+    for item in reversed(results[-SEARCH_LIMIT:]):
+        msg += f"• {item['desc']} | R$ {item.get('price', 0.0):.2f} | {item['km']} Km |{item['date']}|\n"
+    if len(results) > SEARCH_LIMIT:
+        msg += f"• ... e mais {len(results) - SEARCH_LIMIT}\n"
+    msg += f"\n💰 *Total gasto:* R$ {total:.2f}{archived_note}"
+    ctx.reply(msg)
+
+# Comando /profile - Perfil de desempenho sob demanda (só chats em ADMIN_CHAT_IDS)
+@command("/profile", admin=STRICT, args=[("action", str, "status"), ("count", int, 1), ("mem", str, "")],
+         usage="❌ Use: `/profile commands|pdf|report N [mem]`, `/profile status`, `/profile get`, `/profile clear` ou `/profile off`")
+def cmd_profile(ctx):
+    action = ctx.args["action"].lower()
+
+    if action in profiler.TARGETS:
+        count = max(ctx.args["count"], 1)
+        memory = ctx.args["mem"].lower() == "mem"
+        profiler.enable(action, count, memory)
+        ctx.reply(f"🔬 Perfil ativado: {action} nas próximas {count} chamadas"
+                  f"{' (com memória)' if memory else ''}")
+    elif action == "off":
+        profiler.disable()
+        ctx.reply("🔬 Perfil desativado")
+    elif action == "status":
+        active = ", ".join(f"{target} ({count} restantes)" for target, count in profiler.remaining.items())
+        ctx.reply(f"🔬 *PERFIL:* {active or 'desligado'}\n"
+                  f"📂 {len(profiler.list_results())} arquivos gravados")
+    elif action == "get":
+        results, count = profiler.zip_results()
+        try:
+            if count == 0:
+                ctx.reply("⚠️ Nenhum perfil gravado ainda")
+                return
+            filename = f"profiles_{datetime.now().strftime('%Y%m%d_%H%M')}.zip"
+            if not send_document(ctx.chat_id, results, filename, "application/zip"):
+                ctx.reply("❌ Erro ao enviar perfis")
+        finally:
+            results.close()
+    elif action == "clear":
+        ctx.reply(f"🗑️ {profiler.clear_results()} arquivos de perfil removidos")
+    else:
+        ctx.reply(ctx.command.usage)
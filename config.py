@@ -1,4 +1,5 @@
 import os
+import socket
 
 print("🚀 BOT MANUTENÇÃO - POPzinha - CONFIGURAÇÃO")
 
@@ -9,10 +10,59 @@ GIST_ID = os.getenv("GIST_ID")
 PORT = int(os.environ.get("PORT", 8080))
 DELETE_PASSWORD = os.getenv("DELETE_PASSWORD", "123456")
 NOTIFICATION_CHAT_ID = os.getenv("NOTIFICATION_CHAT_ID")
+BOT_USERNAME = os.getenv("BOT_USERNAME")  # opcional: sem ele o router consulta o getMe
+
+# Chats autorizados a usar comandos de administração (separados por vírgula).
+# Vazio = qualquer chat no /delete (comportamento original, protegido por
+# senha); o /profile fica negado a todos
+ADMIN_CHAT_IDS = {chat.strip() for chat in os.getenv("ADMIN_CHAT_IDS", "").split(",") if chat.strip()}
+
+# Envio de alertas para os inscritos (limites da API do Telegram)
+NOTIFY_WORKERS = int(os.environ.get("NOTIFY_WORKERS", 16))
+NOTIFY_GLOBAL_RATE = float(os.environ.get("NOTIFY_GLOBAL_RATE", 30))
+NOTIFY_CHAT_INTERVAL = float(os.environ.get("NOTIFY_CHAT_INTERVAL", 1.0))
+
+# Outbox local para alterações ainda não salvas no Gist
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "outbox.jsonl")
+OUTBOX_RETRY_MIN = int(os.environ.get("OUTBOX_RETRY_MIN", 5))
+OUTBOX_RETRY_MAX = int(os.environ.get("OUTBOX_RETRY_MAX", 300))
+
+# Coordenação entre instâncias (hot standby): off | gist | file
+COORDINATION_MODE = os.getenv("COORDINATION_MODE", "off").lower()
+INSTANCE_ID = os.getenv("INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+# No modo gist cada renovação (a cada LEASE_TTL/3) cria uma revisão do Gist,
+# por isso o lease padrão é mais longo
+LEASE_TTL = int(os.environ.get("LEASE_TTL", 120 if COORDINATION_MODE == "gist" else 30))
+LEASE_FILE = os.getenv("LEASE_FILE", "leader.lock")
+# Gist pequeno só para o leader.json (obrigatório no modo gist): ler o lease
+# do Gist principal baixaria o moto_data.json inteiro a cada renovação
+LEASE_GIST_ID = os.getenv("LEASE_GIST_ID")
+
+# Arquivamento de registros antigos (0 = desativado)
+ARCHIVE_HOT_DAYS = int(os.environ.get("ARCHIVE_HOT_DAYS", 0))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_STORAGE = os.getenv("ARCHIVE_STORAGE", "both").lower()  # local | gist | both
+# Gist só dos segmentos: no Gist principal eles viriam junto em toda leitura
+# do moto_data.json. Obrigatório com ARCHIVE_STORAGE=gist|both (sem ele o
+# arquivamento não roda); só disco local exige ARCHIVE_STORAGE=local
+ARCHIVE_GIST_ID = os.getenv("ARCHIVE_GIST_ID")
+ARCHIVE_INTERVAL = int(os.environ.get("ARCHIVE_INTERVAL", 6 * 3600))
+
+# Limites (em segundos) para considerar o polling/agendador travados no /healthz
+HEALTH_POLLING_MAX_AGE = int(os.environ.get("HEALTH_POLLING_MAX_AGE", 120))
+HEALTH_SCHEDULER_MAX_AGE = int(os.environ.get("HEALTH_SCHEDULER_MAX_AGE", 180))
+
+# Perfil sob demanda (ex: BOT_PROFILE="commands:20,pdf:3:mem"); vazio = desligado
+PROFILE = os.getenv("BOT_PROFILE", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
 
 # Limpar URL do Gist se fornecida como URL completa
 if GIST_ID and "github.com" in GIST_ID:
     GIST_ID = GIST_ID.split("/")[-1]
+if LEASE_GIST_ID and "github.com" in LEASE_GIST_ID:
+    LEASE_GIST_ID = LEASE_GIST_ID.split("/")[-1]
+if ARCHIVE_GIST_ID and "github.com" in ARCHIVE_GIST_ID:
+    ARCHIVE_GIST_ID = ARCHIVE_GIST_ID.split("/")[-1]
 
 # Log das configurações (ocultando informações sensíveis)
 print(f"✅ Bot Token: {BOT_TOKEN[:10]}...")
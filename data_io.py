@@ -0,0 +1,350 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from database import RECORD_TYPES
+from utils import parse_record_date, format_record_date
+
+# ---------------------------------------------------------
+# 🔹 FORMATO DOS ARQUIVOS
+# ---------------------------------------------------------
+# Uma linha por registro, com o tipo na coluna "type":
+#   type,date,km,liters,price,desc
+#   km,18/02/25 às 14:30,15000,,,
+#   fuel,18/02/25 às 14:35,,10,55.00,
+#   manu,20/02/25,15100,,50,Troca de óleo
+FIELDS = ["type", "date", "km", "liters", "price", "desc"]
+
+MAX_IMPORT_ERRORS = 20
+
+# Acima disso o arquivo de exportação sai da memória para o disco
+EXPORT_SPOOL_SIZE = 1024 * 1024
+
+def parse_number(value, conv, name, minimum=None, allow_zero=True):
+    """Converte um campo numérico (aceita vírgula decimal)."""
+    if value is None or str(value).strip() == "":
+        raise ValueError(f"campo '{name}' vazio")
+    try:
+        number = conv(str(value).strip().replace(",", "."))
+    except ValueError:
+        raise ValueError(f"campo '{name}' inválido: {value}")
+    if minimum is not None and (number < minimum or (not allow_zero and number == minimum)):
+        raise ValueError(f"campo '{name}' fora do intervalo: {value}")
+    return number
+
+
+def validate_row(row):
+    """
+    Valida uma linha do arquivo e retorna (tipo, registro) no formato do bot_data.
+    Lança ValueError com a descrição do problema.
+    """
+    tipo = str(row.get("type") or "").strip().lower()
+    if tipo not in RECORD_TYPES:
+        raise ValueError(f"tipo inválido: '{tipo}' (use km, fuel ou manu)")
+
+    date = parse_record_date(str(row.get("date") or ""))
+    if date is None:
+        raise ValueError(f"data inválida: '{row.get('date')}'")
+    date_str = format_record_date(date)
+
+    if tipo == "km":
+        return tipo, {"km": parse_number(row.get("km"), int, "km", 0), "date": date_str}
+
+    if tipo == "fuel":
+        return tipo, {
+            "liters": parse_number(row.get("liters"), float, "liters", 0, allow_zero=False),
+            "price": parse_number(row.get("price"), float, "price", 0),
+            "date": date_str,
+        }
+
+    desc = str(row.get("desc") or "").strip()
+    if not desc:
+        raise ValueError("campo 'desc' vazio")
+    return tipo, {
+        "desc": desc,
+        "date": date_str,
+        "km": parse_number(row.get("km"), int, "km", 0),
+        "price": parse_number(row.get("price"), float, "price", 0),
+    }
+
+
+# ---------------------------------------------------------
+# 🔹 LEITURA EM STREAMING
+# ---------------------------------------------------------
+def iter_csv_rows(lines):
+    """Gera (número da linha, dict) a partir de linhas CSV (separador , ou ;)."""
+    lines = iter(lines)
+    header = next(lines, "")
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    columns = [column.strip().lower() for column in next(csv.reader([header], delimiter=delimiter), [])]
+
+    reader = csv.reader(lines, delimiter=delimiter)
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        # +1 porque o cabeçalho foi lido fora do reader
+        yield reader.line_num + 1, dict(zip(columns, values))
+
+
+def iter_jsonl_rows(lines):
+    """Gera (número da linha, dict) a partir de JSON Lines (um objeto por linha)."""
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, {"_error": f"JSON inválido: {e.msg}"}
+
+
+def iter_json_rows(content):
+    """
+    Gera (número do item, dict) de um documento JSON: lista de linhas com
+    "type" ou objeto no formato do Gist ({"km": [...], "fuel": [...], "manu": [...]}).
+    """
+    document = json.loads(content)
+    if isinstance(document, dict):
+        number = 0
+        for tipo in RECORD_TYPES:
+            for item in document.get(tipo, []):
+                number += 1
+                yield number, dict(item, type=tipo)
+    else:
+        for number, item in enumerate(document, 1):
+            yield number, item
+
+
+def iter_rows(lines, filename):
+    """Escolhe o leitor pelo nome do arquivo (.csv, .jsonl/.ndjson ou .json)."""
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")):
+        return iter_jsonl_rows(lines)
+    if name.endswith(".json"):
+        return iter_json_rows("\n".join(lines))
+    return iter_csv_rows(lines)
+
+
+def parse_import(rows):
+    """
+    Valida todas as linhas e agrupa os registros por tipo.
+    Retorna (batch, erros, total_de_erros, total_de_linhas); erros é uma
+    lista de (linha, mensagem) limitada a MAX_IMPORT_ERRORS.
+    """
+    batch = {tipo: [] for tipo in RECORD_TYPES}
+    errors = []
+    error_count = 0
+    total = 0
+
+    for line_number, row in rows:
+        total += 1
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("linha não é um objeto")
+            if "_error" in row:
+                raise ValueError(row["_error"])
+            tipo, record = validate_row(row)
+            batch[tipo].append(record)
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append((line_number, str(e)))
+
+    return batch, errors, error_count, total
+
+
+# ---------------------------------------------------------
+# 🔹 APLICAÇÃO DO LOTE
+# ---------------------------------------------------------
+def record_key(record):
+    """Chave de deduplicação pelo conteúdo (o id da outbox não entra)."""
+    return json.dumps({field: value for field, value in record.items() if field != "id"},
+                      sort_keys=True, ensure_ascii=False)
+
+
+def date_sort_key(record):
+    date = parse_record_date(record.get("date"))
+    return (date is None, date or 0)
+
+
+def merge_records(data, batch):
+    """
+    Junta um lote de registros históricos em `data`, ignorando os que já
+    existiam antes do lote. KM fica ordenado por quilometragem (o último continua sendo o
+    atual); abastecimentos e manutenções ficam ordenados por data.
+    Retorna quantos registros de cada tipo foram adicionados.
+    """
+    added = {}
+    for tipo in RECORD_TYPES:
+        records = batch.get(tipo, [])
+        if not records:
+            added[tipo] = 0
+            continue
+
+        # Conta as cópias que já existiam: linhas iguais dentro do mesmo lote
+        # (dois abastecimentos iguais no mesmo dia) são registros distintos,
+        # e reimportar o mesmo arquivo continua sem duplicar nada
+        existing = Counter(record_key(record) for record in data[tipo])
+        new_records = []
+        for record in records:
+            key = record_key(record)
+            if existing[key] > 0:
+                existing[key] -= 1
+            else:
+                new_records.append(record)
+
+        if new_records:
+            merged = data[tipo] + new_records
+            if tipo == "km":
+                merged.sort(key=lambda record: record["km"])
+            else:
+                merged.sort(key=date_sort_key)
+            data[tipo] = merged
+        added[tipo] = len(new_records)
+
+    return added
+
+
+def drop_archived(batch, archived):
+    """
+    Tira do lote os registros que já estão em segmentos de arquivo.
+    `archived(tipo, início, fim)` (ex: archive.iter_archived) só lê os
+    segmentos que cruzam o período do lote. Retorna quantos saíram.
+    """
+    dropped = 0
+    for tipo in RECORD_TYPES:
+        records = batch.get(tipo, [])
+        dates = [date for date in (parse_record_date(record.get("date")) for record in records) if date is not None]
+        if not dates:
+            continue
+
+        # Mesma contagem do merge_records: cada cópia arquivada cobre uma linha
+        archived_keys = Counter(record_key(record) for record in archived(tipo, min(dates), max(dates)))
+        if not archived_keys:
+            continue
+
+        kept = []
+        for record in records:
+            key = record_key(record)
+            if archived_keys[key] > 0:
+                archived_keys[key] -= 1
+            else:
+                kept.append(record)
+        dropped += len(records) - len(kept)
+        batch[tipo] = kept
+
+    return dropped
+
+
+# ---------------------------------------------------------
+# 🔹 EXPORTAÇÃO
+# ---------------------------------------------------------
+EXPORT_FORMATS = {"csv": "csv", "json": "jsonl", "jsonl": "jsonl"}
+
+def parse_period(tokens):
+    """
+    Interpreta um período: DD/MM/AA-DD/MM/AA, duas datas ou só a data inicial.
+    Retorna (início, fim), qualquer um podendo ser None; lança ValueError.
+    """
+    dates = []
+    for token in tokens:
+        if "-" in token and "/" in token:
+            dates.extend(token.split("-", 1))
+        else:
+            dates.append(token)
+
+    if len(dates) > 2:
+        raise ValueError("período inválido")
+
+    parsed = []
+    for date_str in dates:
+        date = parse_record_date(date_str)
+        if date is None:
+            raise ValueError(f"data inválida: {date_str}")
+        parsed.append(date)
+
+    start = parsed[0] if parsed else None
+    end = parsed[1] if len(parsed) > 1 else None
+    # Data final sem hora vale pelo dia inteiro
+    if end is not None and end.hour == 0 and end.minute == 0:
+        end = end + timedelta(days=1) - timedelta(minutes=1)
+    return start, end
+
+
+def parse_export_args(tokens):
+    """
+    Interpreta os argumentos do /export em qualquer ordem:
+    formato (csv/json), "gz" e período (ver parse_period).
+    Retorna (formato, início, fim, gz); lança ValueError se algo for inválido.
+    """
+    fmt = "csv"
+    gz = False
+    period = []
+
+    for token in tokens:
+        lower = token.lower()
+        if lower in EXPORT_FORMATS:
+            fmt = EXPORT_FORMATS[lower]
+        elif lower in ("gz", "gzip"):
+            gz = True
+        else:
+            period.append(token)
+
+    start, end = parse_period(period)
+    return fmt, start, end, gz
+
+
+def iter_records(data, start=None, end=None, archived=None):
+    """
+    Gera (tipo, registro) de bot_data, filtrando pelo período se informado.
+    `archived(tipo, início, fim)` (ex: archive.iter_archived) inclui antes
+    os registros arquivados de cada tipo.
+    """
+    for tipo in RECORD_TYPES:
+        if archived is not None:
+            for record in archived(tipo, start, end):
+                yield tipo, record
+        for record in data[tipo]:
+            if start is not None or end is not None:
+                date = parse_record_date(record.get("date"))
+                if date is None:
+                    continue
+                if start is not None and date < start:
+                    continue
+                if end is not None and date > end:
+                    continue
+            yield tipo, record
+
+
+def write_export(records, fmt="csv", gz=False):
+    """
+    Escreve os registros num arquivo temporário (em memória até
+    EXPORT_SPOOL_SIZE, depois em disco), opcionalmente comprimido.
+    Retorna (arquivo posicionado no início, quantidade de registros).
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    target = gzip.GzipFile(fileobj=spool, mode="wb") if gz else spool
+    text = io.TextIOWrapper(target, encoding="utf-8", newline="")
+
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(text)
+        writer.writerow(FIELDS)
+        for tipo, record in records:
+            writer.writerow([tipo] + [record.get(field, "") for field in FIELDS[1:]])
+            count += 1
+    else:
+        for tipo, record in records:
+            row = {field: value for field, value in record.items() if field != "id"}
+            text.write(json.dumps(dict(row, type=tipo), ensure_ascii=False))
+            text.write("\n")
+            count += 1
+
+    text.flush()
+    text.detach()
+    if gz:
+        target.close()
+    spool.seek(0)
+    return spool, count
@@ -1,102 +1,252 @@
 import json
 import requests
+from threading import RLock
 from config import GITHUB_TOKEN, GIST_ID
 
+# Tipos de registro guardados em bot_data
+RECORD_TYPES = ("km", "fuel", "manu")
+
 # Inicializar bot_data globalmente
-bot_data = {"km": [], "fuel": [], "manu": []}
+bot_data = {"km": [], "fuel": [], "manu": [], "subscribers": [], "archive": []}
 
-def load_from_gist():
-    global bot_data
-    
+# Estado dos dados para health checks
+data_loaded = False
+data_version = 0
+
+# Trava para leituras/alterações em bot_data: os comandos a seguram só
+# enquanto mexem nos dados (nunca durante envios ao Telegram) e a
+# outbox/eleição a usam ao trocar os dados em memória pelos do Gist
+data_lock = RLock()
+
+# Revisão do moto_data.json lida/gravada por último (controle de concorrência)
+remote_rev = 0
+
+class ConflictError(Exception):
+    """O Gist foi alterado por outra instância desde a última leitura."""
+
+    def __init__(self, data, rev):
+        super().__init__(f"revisão remota {rev} diferente da esperada {remote_rev}")
+        self.data = data
+        self.rev = rev
+
+
+def gist_headers():
+    return {
+        "Authorization": f"token {GITHUB_TOKEN}",
+        "Accept": "application/vnd.github.v3+json"
+    }
+
+def fetch_gist_files(gist_id=None):
+    """Baixa os arquivos do Gist. Retorna o dict de arquivos ou None se falhar."""
+    url = f"https://api.github.com/gists/{gist_id or GIST_ID}"
+    response = requests.get(url, headers=gist_headers(), timeout=10)
+
+    if response.status_code != 200:
+        print(f"❌ Erro ao carregar Gist: {response.status_code}")
+        return None
+    return response.json().get("files", {})
+
+def gist_file_content(file):
+    """
+    Conteúdo de um arquivo do Gist. Acima de 1 MB a API devolve o conteúdo
+    cortado (truncated) e o arquivo completo precisa ser baixado pelo raw_url.
+    """
+    if not file.get("truncated"):
+        return file["content"]
+    return fetch_raw(file["raw_url"])
+
+def fetch_raw(raw_url):
+    """Baixa um único arquivo do Gist pelo raw_url (sem o resto do Gist)."""
+    response = requests.get(raw_url, headers=gist_headers(), timeout=30)
+    response.raise_for_status()
+    response.encoding = "utf-8"
+    return response.text
+
+def parse_gist_data(files):
+    """Extrai (dados, revisão) do moto_data.json; (None, 0) se não existir."""
+    if "moto_data.json" not in files:
+        return None, 0
+
+    loaded_data = json.loads(gist_file_content(files["moto_data.json"]))
+    rev = loaded_data.pop("_rev", 0)
+
+    # Garantir que manutenções antigas tenham campo de preço
+    for manu in loaded_data.get("manu", []):
+        if "price" not in manu:
+            manu["price"] = 0.0  # Valor padrão para manutenções antigas
+
+    return loaded_data, rev
+
+def fetch_remote_data():
+    """
+    Baixa e interpreta o moto_data.json (só rede, não mexe em bot_data,
+    então pode rodar sem data_lock). Retorna (dados, revisão) ou None se falhar.
+    """
     print(f"📂 Tentando carregar dados do Gist: {GIST_ID}")
-    
+
     if not GITHUB_TOKEN or not GIST_ID:
         print("❌ GITHUB_TOKEN ou GIST_ID não configurados")
-        bot_data = {"km": [], "fuel": [], "manu": []}
-        return bot_data
-    
+        return None
+
     try:
-        url = f"https://api.github.com/gists/{GIST_ID}"
-        headers = {
-            "Authorization": f"token {GITHUB_TOKEN}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            gist_data = response.json()
-            files = gist_data.get("files", {})
-            if "moto_data.json" in files:
-                content = files["moto_data.json"]["content"]
-                loaded_data = json.loads(content)
-                
-                # Garantir que manutenções antigas tenham campo de preço
-                for manu in loaded_data.get("manu", []):
-                    if "price" not in manu:
-                        manu["price"] = 0.0  # Valor padrão para manutenções antigas
-                
-                bot_data.update(loaded_data)
-                print(f"✅ Dados carregados: {len(bot_data['km'])} KM, {len(bot_data['fuel'])} abastecimentos, {len(bot_data['manu'])} manutenções")
-        else:
-            print(f"❌ Erro ao carregar Gist: {response.status_code}")
-            bot_data = {"km": [], "fuel": [], "manu": []}
-            
+        files = fetch_gist_files()
+        if files is None:
+            return None
+        return parse_gist_data(files)
     except Exception as e:
         print(f"❌ Erro ao carregar dados: {e}")
-        bot_data = {"km": [], "fuel": [], "manu": []}
-    
+        return None
+
+def apply_remote_data(remote):
+    """
+    Aplica em bot_data (sempre no mesmo dict, pois os outros módulos
+    importam a referência) o resultado de fetch_remote_data. Se a carga
+    falhou mantém o que já está em memória e marca os dados como não
+    carregados. Quem chama segura data_lock quando há outras threads.
+    """
+    global data_loaded, remote_rev
+
+    if remote is None:
+        data_loaded = False
+        touch_data()
+        return bot_data
+
+    loaded_data, rev = remote
+    if loaded_data is not None:
+        bot_data.update(loaded_data)
+        bot_data.setdefault("subscribers", [])
+        bot_data.setdefault("archive", [])
+        print(f"✅ Dados carregados: {len(bot_data['km'])} KM, {len(bot_data['fuel'])} abastecimentos, {len(bot_data['manu'])} manutenções")
+    remote_rev = rev
+    data_loaded = True
+    touch_data()
     return bot_data
 
-def save_to_gist(data):
+def load_from_gist():
+    """Carrega os dados do Gist para bot_data (ver apply_remote_data)."""
+    return apply_remote_data(fetch_remote_data())
+
+def save_to_gist(data, check_version=False):
     """
     Salva os dados no Gist do GitHub
     Retorna True se salvou com sucesso, False se falhou
+    Com check_version=True confere antes se a revisão do Gist ainda é a
+    última lida/gravada por esta instância; se não for, lança ConflictError
+    com os dados remotos para que o chamador faça o merge.
     """
+    global remote_rev
+    
     print(f"💾 Tentando salvar dados no Gist: {GIST_ID}")
     
+    # Os comandos alteram bot_data antes de salvar
+    touch_data()
+    
     if not GITHUB_TOKEN or not GIST_ID:
         print("❌ GITHUB_TOKEN ou GIST_ID não configurados")
         return False
     
     try:
+        if check_version:
+            files = fetch_gist_files()
+            if files is None:
+                return False
+            current_data, current_rev = parse_gist_data(files)
+            if current_rev != remote_rev:
+                raise ConflictError(current_data or {}, current_rev)
+
         url = f"https://api.github.com/gists/{GIST_ID}"
-        headers = {
-            "Authorization": f"token {GITHUB_TOKEN}",
-            "Accept": "application/vnd.github.v3+json"
-        }
         
+        # Sem indentação: o arquivo cresce com o histórico importado
         payload = {
             "files": {
                 "moto_data.json": {
-                    "content": json.dumps(data, indent=2, ensure_ascii=False)
+                    "content": json.dumps(dict(data, _rev=remote_rev + 1), ensure_ascii=False, separators=(",", ":"))
                 }
             }
         }
         
-        response = requests.patch(url, headers=headers, json=payload, timeout=10)
+        response = requests.patch(url, headers=gist_headers(), json=payload, timeout=10)
         success = response.status_code == 200
         
         if success:
+            remote_rev += 1
             print("✅ Dados salvos com sucesso no Gist")
         else:
             print(f"❌ Erro ao salvar: {response.status_code} - {response.text}")
             
         return success
         
+    except ConflictError:
+        raise
     except Exception as e:
         print(f"❌ Erro ao salvar dados: {e}")
         return False
 
+def adopt_remote(data, rev):
+    """Substitui bot_data (no mesmo dict) pelos dados remotos já mesclados."""
+    global remote_rev
+    data.setdefault("subscribers", [])
+    data.setdefault("archive", [])
+    update_bot_data(data)
+    remote_rev = rev
+
+def read_gist_file(filename, gist_id=None):
+    """Lê um arquivo auxiliar do Gist (ex: leader.json). None se falhar/não existir."""
+    files = fetch_gist_files(gist_id)
+    if files is None or filename not in files:
+        return None
+    return gist_file_content(files[filename])
+
+def write_gist_file(filename, content, gist_id=None):
+    """
+    Grava um arquivo auxiliar no Gist.
+    Retorna os dados do arquivo gravado (inclui raw_url) ou None se falhou.
+    """
+    url = f"https://api.github.com/gists/{gist_id or GIST_ID}"
+    payload = {"files": {filename: {"content": content}}}
+    response = requests.patch(url, headers=gist_headers(), json=payload, timeout=30)
+    if response.status_code != 200:
+        return None
+    return response.json().get("files", {}).get(filename, {"filename": filename})
+
+def delete_gist_files(filenames, gist_id=None):
+    """Apaga arquivos do Gist. Retorna True se a API confirmou."""
+    url = f"https://api.github.com/gists/{gist_id or GIST_ID}"
+    payload = {"files": {filename: None for filename in filenames}}
+    response = requests.patch(url, headers=gist_headers(), json=payload, timeout=30)
+    return response.status_code == 200
+
+def snapshot_data():
+    """
+    Cópia rasa de bot_data (as listas são copiadas, os registros não).
+    Tirada com data_lock, permite ler os dados depois sem segurar a trava
+    (ex: enquanto segmentos arquivados são baixados).
+    """
+    return {key: list(value) if isinstance(value, list) else value for key, value in bot_data.items()}
+
 def get_bot_data():
     """Retorna os dados do bot"""
     return bot_data
 
 def update_bot_data(new_data):
     """Atualiza os dados do bot"""
-    global bot_data
-    bot_data = new_data
+    bot_data.clear()
+    bot_data.update(new_data)
+    touch_data()
     print(f"🔄 Dados atualizados: {len(bot_data['km'])} KM, {len(bot_data['fuel'])} abastecimentos, {len(bot_data['manu'])} manutenções")
 
+def is_data_loaded():
+    """Retorna True se o último carregamento do Gist foi bem-sucedido"""
+    return data_loaded
+
+def get_data_version():
+    """Retorna a versão atual dos dados (muda a cada carga/alteração)"""
+    return data_version
+
+def touch_data():
+    """Marca os dados como alterados, invalidando caches derivados"""
+    global data_version
+    data_version += 1
+
 # Carregar dados automaticamente ao importar o módulo
 load_from_gist()
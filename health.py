@@ -0,0 +1,181 @@
+import json
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Lock
+from config import PORT, HEALTH_POLLING_MAX_AGE, HEALTH_SCHEDULER_MAX_AGE
+from database import get_bot_data, get_data_version, is_data_loaded
+from router import get_command_stats
+from outbox import pending_count
+from leader import get_role
+from utils import get_last_km, get_last_oil_change, total_fuel_por_mes, total_fuel_geral, total_manu_geral, format_date
+
+# ---------------------------------------------------------
+# 🔹 HEARTBEATS DAS THREADS
+# ---------------------------------------------------------
+started_at = time.monotonic()
+heartbeats = {}
+
+def beat(name):
+    """Registra que a thread `name` (polling, scheduler...) está viva."""
+    heartbeats[name] = time.monotonic()
+
+
+def heartbeat_age(name):
+    """
+    Retorna há quantos segundos a thread deu sinal de vida.
+    Antes do primeiro sinal conta o tempo desde o início do processo.
+    """
+    last = heartbeats.get(name, started_at)
+    return time.monotonic() - last
+
+
+def liveness():
+    """Retorna (ok, detalhes) com base na idade dos heartbeats."""
+    checks = {
+        "polling": (heartbeat_age("polling"), HEALTH_POLLING_MAX_AGE),
+        "scheduler": (heartbeat_age("scheduler"), HEALTH_SCHEDULER_MAX_AGE),
+    }
+    details = {}
+    ok = True
+    for name, (age, max_age) in checks.items():
+        alive = age <= max_age
+        ok = ok and alive
+        details[name] = {"ok": alive, "age": round(age, 1), "max_age": max_age}
+    return ok, details
+
+
+# ---------------------------------------------------------
+# 🔹 SNAPSHOT DE STATUS (CACHE POR VERSÃO DOS DADOS)
+# ---------------------------------------------------------
+snapshot_lock = Lock()
+snapshot_cache = {"version": None, "body": b"{}"}
+
+def oil_status(current_km):
+    """Status numérico da troca de óleo (mesmas faixas do alerta)."""
+    last_oil_km = get_last_oil_change()
+    if last_oil_km == 0:
+        return {"last_change_km": None, "km_since": None, "km_remaining": None, "level": "sem_registro"}
+
+    km_since_last_oil = current_km - last_oil_km
+    km_remaining = 1000 - km_since_last_oil
+
+    if km_since_last_oil >= 1000:
+        level = "vencido"
+    elif km_remaining <= 100:
+        level = "critico"
+    elif km_remaining <= 300:
+        level = "alerta"
+    elif km_remaining <= 500:
+        level = "lembrete"
+    else:
+        level = "ok"
+
+    return {
+        "last_change_km": last_oil_km,
+        "km_since": km_since_last_oil,
+        "km_remaining": km_remaining,
+        "level": level,
+    }
+
+
+def build_status():
+    """Monta o JSON de status a partir dos dados atuais."""
+    data = get_bot_data()
+    current_km = get_last_km()
+
+    return {
+        "km": current_km,
+        "oil": oil_status(current_km),
+        "totals": {
+            "fuel": round(total_fuel_geral(), 2),
+            "fuel_by_month": total_fuel_por_mes(),
+            "manu": round(total_manu_geral(), 2),
+        },
+        "records": {
+            "km": len(data["km"]),
+            "fuel": len(data["fuel"]),
+            "manu": len(data["manu"]),
+            "archived": sum(segment["count"] for segment in data.get("archive", [])),
+        },
+        "data_loaded": is_data_loaded(),
+        "generated_at": format_date(),
+    }
+
+
+def get_status_body():
+    """
+    Retorna o JSON de status já serializado.
+    Só recalcula quando a versão dos dados muda; se outra thread já está
+    recalculando, devolve o snapshot anterior em vez de esperar.
+    """
+    version = get_data_version()
+    if snapshot_cache["version"] == version:
+        return snapshot_cache["body"]
+
+    if not snapshot_lock.acquire(blocking=False):
+        return snapshot_cache["body"]
+
+    try:
+        if snapshot_cache["version"] != version:
+            body = json.dumps(build_status(), ensure_ascii=False).encode("utf-8")
+            snapshot_cache["body"] = body
+            snapshot_cache["version"] = version
+        return snapshot_cache["body"]
+    except Exception as e:
+        print(f"❌ Erro ao gerar status: {e}")
+        return snapshot_cache["body"]
+    finally:
+        snapshot_lock.release()
+
+
+# ---------------------------------------------------------
+# 🔹 SERVIDOR HTTP
+# ---------------------------------------------------------
+class HealthHandler(BaseHTTPRequestHandler):
+    """
+    Handler para health checks
+    /healthz - liveness (heartbeat do polling e do agendador)
+    /readyz  - readiness (dados carregados do Gist)
+    /status  - JSON com KM atual, status do óleo e totais
+    /metrics - JSON com latência por comando
+    """
+    def do_GET(self):
+        path = self.path.split("?")[0]
+
+        if path == "/healthz":
+            ok, details = liveness()
+            self.send_json(200 if ok else 503, {"ok": ok, "checks": details})
+        elif path == "/readyz":
+            ok = is_data_loaded()
+            self.send_json(200 if ok else 503, {"ok": ok, "data_loaded": ok, "outbox_pending": pending_count(), "role": get_role()})
+        elif path == "/status":
+            self.send_body(200, "application/json; charset=utf-8", get_status_body())
+        elif path == "/metrics":
+            self.send_json(200, {"commands": get_command_stats()})
+        else:
+            self.send_body(200, "text/plain", b'Bot is running!')
+
+    def send_json(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_body(code, "application/json; charset=utf-8", body)
+
+    def send_body(self, code, content_type, body):
+        self.send_response(code)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Suprime logs do servidor HTTP"""
+        return
+
+def start_http_server():
+    """
+    Inicia servidor HTTP (uma thread por requisição) para health checks
+    Necessário para plataformas de hospedagem como Railway
+    """
+    server = ThreadingHTTPServer(('0.0.0.0', PORT), HealthHandler)
+    server.daemon_threads = True
+    print(f"🌐 HTTP Server rodando na porta {PORT}")
+    server.serve_forever()
@@ -0,0 +1,140 @@
+import fcntl
+import json
+import os
+import time
+from config import COORDINATION_MODE, INSTANCE_ID, LEASE_TTL, LEASE_FILE, LEASE_GIST_ID
+from database import read_gist_file, write_gist_file, fetch_remote_data, apply_remote_data, get_bot_data, is_data_loaded, data_lock
+
+# ---------------------------------------------------------
+# 🔹 ARMAZENAMENTO DO LEASE
+# ---------------------------------------------------------
+# O lease é {"holder": INSTANCE_ID, "expires_at": timestamp}. Só o dono de
+# um lease válido faz polling, envia notificações e grava no Gist.
+
+class FileLeaseStore:
+    """Lease num arquivo local protegido por flock (várias instâncias na mesma máquina)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def try_acquire(self, instance_id, ttl):
+        with open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                lease = json.loads(content) if content.strip() else {}
+                now = time.time()
+
+                if lease.get("holder") in (None, instance_id) or lease.get("expires_at", 0) < now:
+                    lease = {"holder": instance_id, "expires_at": now + ttl}
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(lease, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                return lease
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class GistLeaseStore:
+    """
+    Lease no arquivo leader.json de um Gist próprio (LEASE_GIST_ID).
+    A API de Gists não tem compare-and-set, então depois de gravar o lease
+    ele é relido: se outra instância gravou no meio, vale o que ficou lá.
+    """
+    FILENAME = "leader.json"
+
+    def __init__(self, gist_id):
+        self.gist_id = gist_id
+
+    def try_acquire(self, instance_id, ttl):
+        content = read_gist_file(self.FILENAME, self.gist_id)
+        lease = json.loads(content) if content else {}
+        now = time.time()
+
+        if lease.get("holder") in (None, instance_id) or lease.get("expires_at", 0) < now:
+            taking_over = lease.get("holder") != instance_id
+            lease = {"holder": instance_id, "expires_at": now + ttl}
+            if not write_gist_file(self.FILENAME, json.dumps(lease), self.gist_id):
+                return {}
+            if taking_over:
+                time.sleep(2)
+                content = read_gist_file(self.FILENAME, self.gist_id)
+                lease = json.loads(content) if content else {}
+        return lease
+
+
+# ---------------------------------------------------------
+# 🔹 ELEIÇÃO
+# ---------------------------------------------------------
+lease_expires_at = 0.0
+role = "leader" if COORDINATION_MODE == "off" else "standby"
+
+def get_lease_store():
+    if COORDINATION_MODE == "gist":
+        return GistLeaseStore(LEASE_GIST_ID)
+    return FileLeaseStore(LEASE_FILE)
+
+
+def is_leader():
+    """
+    True se esta instância pode fazer polling e gravar no Gist.
+    Sem coordenação é sempre True; com coordenação exige lease ainda válido
+    (se a renovação falhar, a instância para sozinha antes do lease expirar).
+    """
+    if COORDINATION_MODE == "off":
+        return True
+    return role == "leader" and time.time() < lease_expires_at
+
+
+def get_role():
+    return "leader" if is_leader() else "standby"
+
+
+def leader_elector():
+    """
+    Renova (ou tenta obter) o lease a cada LEASE_TTL/3 segundos
+    Ao virar líder recarrega os dados do Gist, pois o standby pode estar
+    com uma cópia antiga
+    """
+    global lease_expires_at, role
+
+    if COORDINATION_MODE == "off":
+        return
+
+    # Sem Gist próprio para o lease a instância fica em standby (não faz
+    # polling) em vez de arriscar duas instâncias líderes
+    if COORDINATION_MODE == "gist" and not LEASE_GIST_ID:
+        print("❌ COORDINATION_MODE=gist requer LEASE_GIST_ID; instância fica em standby")
+        return
+
+    # Importado aqui para evitar import circular (outbox usa is_leader)
+    from outbox import reconcile
+
+    store = get_lease_store()
+    print(f"👑 Eleição de líder ({COORDINATION_MODE}) - instância {INSTANCE_ID}")
+
+    while True:
+        try:
+            lease = store.try_acquire(INSTANCE_ID, LEASE_TTL)
+            if lease.get("holder") == INSTANCE_ID:
+                if role != "leader":
+                    print("👑 Esta instância virou líder, recarregando dados...")
+                    # Download fora da trava; só a troca dos dados a segura
+                    remote = fetch_remote_data()
+                    with data_lock:
+                        apply_remote_data(remote)
+                        if is_data_loaded():
+                            reconcile(get_bot_data())
+                role = "leader"
+                lease_expires_at = lease["expires_at"]
+            else:
+                if role == "leader":
+                    print(f"💤 Liderança perdida para {lease.get('holder')}")
+                role = "standby"
+        except Exception as e:
+            print(f"❌ Erro na eleição de líder: {e}")
+
+        time.sleep(LEASE_TTL / 3)
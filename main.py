@@ -1,35 +1,12 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
 from threading import Thread
-from config import PORT
-from database import load_from_gist, get_bot_data, update_bot_data
+from database import load_from_gist, get_bot_data, update_bot_data, is_data_loaded
 from notifications import notification_scheduler
 from polling import polling_loop
-
-# ========== SERVIDOR WEB PARA HEALTH CHECK ==========
-
-class HealthHandler(BaseHTTPRequestHandler):
-    """
-    Handler simples para health checks
-    Retorna status 200 para verificações de saúde
-    """
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/plain')
-        self.end_headers()
-        self.wfile.write(b'Bot is running!')
-    
-    def log_message(self, format, *args):
-        """Suprime logs do servidor HTTP"""
-        return
-
-def start_http_server():
-    """
-    Inicia servidor HTTP simples para health checks
-    Necessário para plataformas de hospedagem como Railway
-    """
-    server = HTTPServer(('0.0.0.0', PORT), HealthHandler)
-    print(f"🌐 HTTP Server rodando na porta {PORT}")
-    server.serve_forever()
+from health import start_http_server
+from outbox import reconcile, outbox_retrier
+from leader import leader_elector
+from archive import archive_scheduler
+from router import load_bot_username
 
 # ========== INICIALIZAÇÃO DO SISTEMA ==========
 
@@ -40,15 +17,30 @@ def start():
     load_from_gist()
 
     bot_data = get_bot_data()
+
+    # Reaplicar alterações que não chegaram ao Gist antes do último desligamento
+    if is_data_loaded():
+        reconcile(bot_data)
     
     if bot_data and len(bot_data["km"]) > 0:
         print(f"🎉 Dados carregados! KM atual: {bot_data['km'][-1]['km']}")
     else:
         print("⚠️ Nenhum dado carregado ou Gist vazio")
     
+    load_bot_username()
+
     http_thread = Thread(target=start_http_server, daemon=True)
     http_thread.start()
     
+    leader_thread = Thread(target=leader_elector, daemon=True)
+    leader_thread.start()
+    
+    outbox_thread = Thread(target=outbox_retrier, daemon=True)
+    outbox_thread.start()
+    
+    archive_thread = Thread(target=archive_scheduler, daemon=True)
+    archive_thread.start()
+    
     notification_thread = Thread(target=notification_scheduler, daemon=True)
     notification_thread.start()
     
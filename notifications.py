@@ -1,17 +1,128 @@
 import time
 import pytz
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from config import NOTIFICATION_CHAT_ID
-from database import bot_data
-from utils import get_last_km, check_oil_change_alert, send_message
+from threading import Lock
+from config import BOT_TOKEN, NOTIFICATION_CHAT_ID, NOTIFY_WORKERS, NOTIFY_GLOBAL_RATE, NOTIFY_CHAT_INTERVAL
+from database import bot_data, data_lock
+from leader import is_leader
+from outbox import record_remove
+from utils import get_last_km, check_oil_change_alert
+from health import beat
+
+# ---------------------------------------------------------
+# 🔹 ENVIO PARA OS INSCRITOS
+# ---------------------------------------------------------
+# Sessão compartilhada pelas threads do envio (reaproveita conexões)
+session = requests.Session()
+session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=NOTIFY_WORKERS))
+
+class RateLimiter:
+    """
+    Respeita os limites do Telegram: no máximo NOTIFY_GLOBAL_RATE mensagens
+    por segundo no total e uma mensagem a cada NOTIFY_CHAT_INTERVAL por chat.
+    """
+    def __init__(self, rate, chat_interval):
+        self.interval = 1.0 / rate
+        self.chat_interval = chat_interval
+        self.next_slot = 0.0
+        self.chat_last = {}
+        self.lock = Lock()
+
+    def acquire(self, chat_id):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot, self.chat_last.get(chat_id, 0.0) + self.chat_interval)
+            self.next_slot = slot + self.interval
+            self.chat_last[chat_id] = slot
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        """Adia o próximo envio de todas as threads (resposta 429 do Telegram)."""
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+limiter = RateLimiter(NOTIFY_GLOBAL_RATE, NOTIFY_CHAT_INTERVAL)
+
+def deliver(chat_id, text):
+    """
+    Envia uma mensagem para um inscrito.
+    Retorna "ok", "blocked" (bot bloqueado/chat inexistente) ou "failed".
+    """
+    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+    data = {"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}
+
+    for attempt in range(3):
+        limiter.acquire(chat_id)
+        try:
+            response = session.post(url, json=data, timeout=5)
+        except Exception as e:
+            print(f"❌ Erro ao enviar para {chat_id}: {e}")
+            continue
+
+        if response.status_code == 200:
+            return "ok"
+        if response.status_code == 429:
+            # O limite é global: todas as threads esperam, não só esta
+            retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+            limiter.pause(retry_after)
+            continue
+        if response.status_code == 403 or (response.status_code == 400 and "chat not found" in response.text):
+            return "blocked"
+        print(f"❌ Erro ao enviar para {chat_id}: {response.status_code} - {response.text}")
+        return "failed"
+
+    return "failed"
+
+
+def get_subscribers():
+    """Chats inscritos + NOTIFICATION_CHAT_ID (se configurado)."""
+    chats = list(bot_data.get("subscribers", []))
+    if NOTIFICATION_CHAT_ID and NOTIFICATION_CHAT_ID not in [str(chat) for chat in chats]:
+        chats.append(NOTIFICATION_CHAT_ID)
+    return chats
+
+
+def broadcast(text):
+    """
+    Envia o mesmo texto para todos os inscritos em paralelo.
+    Chats que bloquearam o bot são removidos da lista de inscritos.
+    Retorna um dicionário com a contagem por resultado.
+    """
+    chats = get_subscribers()
+    if not chats:
+        return {}
+
+    # O envio roda na thread do agendador: o heartbeat a cada resultado
+    # evita que o /healthz a dê como travada numa lista grande de inscritos
+    results = []
+    with ThreadPoolExecutor(max_workers=min(NOTIFY_WORKERS, len(chats))) as pool:
+        for result in pool.map(lambda chat: deliver(chat, text), chats):
+            results.append(result)
+            beat("scheduler")
+
+    summary = {}
+    for chat_id, result in zip(chats, results):
+        summary[result] = summary.get(result, 0) + 1
+        if result != "blocked":
+            continue
+        # Checagem e remoção sob a trava (um /unsubscribe pode ter vindo no meio)
+        with data_lock:
+            subscribers = bot_data.get("subscribers", [])
+            if chat_id not in subscribers:
+                continue
+            subscribers.remove(chat_id)
+            record_remove("subscribers", chat_id)
+        print(f"🔕 Chat {chat_id} removido dos inscritos (bot bloqueado)")
+
+    return summary
+
 
 def send_daily_notification():
-    """Envia notificação diária sobre status do óleo"""
-    print(f"🔔 Tentando enviar notificação para chat: {NOTIFICATION_CHAT_ID}")
-    
-    if not NOTIFICATION_CHAT_ID:
-        print("❌ NOTIFICATION_CHAT_ID não configurado")
-        return
+    """Envia notificação diária sobre status do óleo para todos os inscritos"""
+    print("🔔 Tentando enviar notificação para os inscritos")
     
     try:
         current_km = get_last_km()
@@ -23,8 +134,11 @@ def send_daily_notification():
             
             if alert_msg:
                 notification = f" ```     🔔 MANUTENÇÃO POPzinha 🔔```\n{alert_msg}"
-                send_message(NOTIFICATION_CHAT_ID, notification)
-                print(f"✅ Notificação enviada para chat {NOTIFICATION_CHAT_ID}")
+                summary = broadcast(notification)
+                if summary:
+                    print(f"✅ Notificação enviada: {summary}")
+                else:
+                    print("❌ Nenhum chat inscrito nem NOTIFICATION_CHAT_ID configurado")
             else:
                 print("ℹ️ Sem alerta ativo para notificação")
         else:
@@ -42,13 +156,15 @@ def notification_scheduler():
     last_notification_hour = None
     
     while True:
+        beat("scheduler")
         try:
             now = datetime.now(pytz.timezone('America/Sao_Paulo'))
             current_hour = now.hour
             current_minute = now.minute
             
             # Verificar horários configurados (8:00 e 14:00)
-            if ((current_hour == 8 and current_minute == 0) or (current_hour == 20 and current_minute == 0)) and last_notification_hour != current_hour:
+            # Só o líder envia, para o standby não duplicar os alertas
+            if ((current_hour == 8 and current_minute == 0) or (current_hour == 20 and current_minute == 0)) and last_notification_hour != current_hour and is_leader():
                 print("🕗 Enviando notificação...")
                 send_daily_notification()
                 last_notification_hour = current_hour
@@ -0,0 +1,276 @@
+import json
+import os
+import time
+import uuid
+from threading import Lock, Event
+from config import OUTBOX_PATH, OUTBOX_RETRY_MIN, OUTBOX_RETRY_MAX, COORDINATION_MODE
+from data_io import merge_records, record_key
+from database import get_bot_data, snapshot_data, save_to_gist, fetch_remote_data, apply_remote_data, is_data_loaded, touch_data, adopt_remote, data_lock, ConflictError
+from leader import is_leader
+
+# ---------------------------------------------------------
+# 🔹 OUTBOX EM DISCO
+# ---------------------------------------------------------
+# Cada alteração feita pelos comandos vira uma entrada no arquivo local
+# antes da resposta ao usuário. A thread outbox_retrier salva bot_data no
+# Gist e só então remove as entradas; se o processo reiniciar antes disso,
+# reconcile() reaplica as entradas sobre os dados baixados do Gist.
+entries = []
+lock = Lock()
+wakeup = Event()
+
+def load_outbox():
+    """
+    Carrega entradas pendentes do disco (se houver).
+    O arquivo é JSON Lines (uma entrada por linha); uma última linha
+    incompleta (queda no meio da gravação) é descartada.
+    """
+    if not os.path.exists(OUTBOX_PATH):
+        return entries
+
+    try:
+        loaded = []
+        damaged = False
+        with open(OUTBOX_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                # Sem quebra de linha no fim: gravação interrompida
+                if not line.endswith("\n"):
+                    damaged = True
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    print("⚠️ Outbox: linha incompleta descartada")
+                    damaged = True
+                    continue
+                loaded.append(item)
+        entries[:] = loaded
+        # Regrava sem a linha quebrada, para o próximo append começar numa
+        # linha nova
+        if damaged:
+            write_outbox()
+        if entries:
+            print(f"📮 Outbox: {len(entries)} alterações pendentes encontradas")
+    except Exception as e:
+        print(f"❌ Erro ao ler outbox: {e}")
+    return entries
+
+
+def append_outbox(entry):
+    """Acrescenta uma entrada no fim do arquivo (sem regravar as anteriores)."""
+    with open(OUTBOX_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_outbox():
+    """
+    Compacta o arquivo só com as entradas ainda pendentes, de forma atômica
+    (arquivo temporário + rename). Chamado depois de um save bem-sucedido.
+    """
+    tmp_path = f"{OUTBOX_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, OUTBOX_PATH)
+
+
+def enqueue(op, tipo=None, record=None):
+    """
+    Registra uma alteração já aplicada em memória.
+    Retorna True quando a entrada está gravada em disco.
+    Registros novos (dicts) recebem o id da entrada: é ele, e não o valor,
+    que torna a reaplicação idempotente (dois /fuel iguais no mesmo minuto
+    são dois registros).
+    """
+    entry_id = uuid.uuid4().hex
+    if op == "add" and isinstance(record, dict):
+        record.setdefault("id", entry_id)
+    entry = {"id": entry_id, "op": op, "type": tipo, "record": record, "ts": time.time()}
+
+    with lock:
+        entries.append(entry)
+        try:
+            append_outbox(entry)
+            ok = True
+        except Exception as e:
+            print(f"❌ Erro ao gravar outbox: {e}")
+            ok = False
+
+    touch_data()
+    wakeup.set()
+    return ok
+
+
+def record_add(tipo, record):
+    return enqueue("add", tipo, record)
+
+
+def record_remove(tipo, record):
+    return enqueue("remove", tipo, record)
+
+
+def record_clear():
+    return enqueue("clear")
+
+
+def record_batch(batch):
+    """Lote de registros importados (uma única entrada e um único save)."""
+    return enqueue("merge", record=batch)
+
+
+def record_archive(tipo, summary, records):
+    """Registros movidos para um segmento de arquivo (ver archive.py)."""
+    return enqueue("archive", tipo, {"summary": summary, "records": records})
+
+
+def pending_count():
+    return len(entries)
+
+
+# ---------------------------------------------------------
+# 🔹 RECONCILIAÇÃO
+# ---------------------------------------------------------
+def find_record(items, record):
+    """Posição de `record` em `items`: pelo id quando houver, senão pelo valor."""
+    if isinstance(record, dict) and "id" in record:
+        for position, item in enumerate(items):
+            if isinstance(item, dict) and item.get("id") == record["id"]:
+                return position
+        return None
+    return items.index(record) if record in items else None
+
+
+def apply_entry(data, entry):
+    """Aplica uma entrada sobre `data` (idempotente para add/remove)."""
+    op = entry["op"]
+    tipo = entry.get("type")
+    record = entry.get("record")
+
+    if op == "add":
+        if find_record(data.setdefault(tipo, []), record) is None:
+            data[tipo].append(record)
+    elif op == "remove":
+        position = find_record(data.setdefault(tipo, []), record)
+        if position is not None:
+            del data[tipo][position]
+    elif op == "merge":
+        merge_records(data, record)
+    elif op == "archive":
+        archived = data.setdefault("archive", [])
+        if all(summary["id"] != record["summary"]["id"] for summary in archived):
+            archived.append(record["summary"])
+        keys = {record_key(item) for item in record["records"]}
+        data[tipo] = [item for item in data[tipo] if record_key(item) not in keys]
+    elif op == "clear":
+        data["km"] = []
+        data["fuel"] = []
+        data["manu"] = []
+        data["archive"] = []
+
+
+def reconcile(data):
+    """Reaplica as entradas pendentes sobre os dados vindos do Gist."""
+    with lock:
+        pending = list(entries)
+
+    for entry in pending:
+        apply_entry(data, entry)
+
+    if pending:
+        touch_data()
+        print(f"📮 Outbox: {len(pending)} alterações reaplicadas sobre o Gist")
+        wakeup.set()
+    return len(pending)
+
+
+# ---------------------------------------------------------
+# 🔹 ENVIO EM SEGUNDO PLANO
+# ---------------------------------------------------------
+def flush():
+    """
+    Salva bot_data no Gist e descarta as entradas cobertas pelo save.
+    Se os dados nunca foram carregados, carrega e reconcilia antes, para
+    não sobrescrever o Gist com um estado parcial.
+    Com coordenação ativa o save confere a revisão do Gist; se outra
+    instância gravou antes, as entradas pendentes são reaplicadas sobre os
+    dados remotos e o save é repetido.
+    """
+    if not is_data_loaded():
+        # Download fora da trava: com o GitHub fora do ar os comandos
+        # continuam respondendo enquanto a outbox tenta de novo
+        remote = fetch_remote_data()
+        if remote is None:
+            return False
+        with data_lock:
+            apply_remote_data(remote)
+            reconcile(get_bot_data())
+
+    check_version = COORDINATION_MODE != "off"
+
+    for attempt in range(3):
+        # Cópia rasa sob a trava: os comandos alteram e enfileiram juntos,
+        # então toda entrada em `ids` está refletida no que será gravado
+        with data_lock:
+            with lock:
+                ids = {entry["id"] for entry in entries}
+            snapshot = snapshot_data()
+
+        try:
+            if not save_to_gist(snapshot, check_version):
+                return False
+        except ConflictError as conflict:
+            print(f"🔀 Conflito no Gist ({conflict}), mesclando alterações...")
+            with data_lock:
+                reconcile(conflict.data)
+                adopt_remote(conflict.data, conflict.rev)
+            continue
+
+        with lock:
+            entries[:] = [entry for entry in entries if entry["id"] not in ids]
+            try:
+                write_outbox()
+            except Exception as e:
+                print(f"❌ Erro ao gravar outbox: {e}")
+        return True
+
+    return False
+
+
+def outbox_retrier():
+    """
+    Esvazia a outbox em segundo plano
+    Tenta logo após cada alteração; em caso de falha espera com backoff
+    exponencial (OUTBOX_RETRY_MIN até OUTBOX_RETRY_MAX segundos)
+    """
+    print("📮 Iniciando envio da outbox...")
+    delay = OUTBOX_RETRY_MIN
+
+    while True:
+        wakeup.wait(60)
+        wakeup.clear()
+
+        # Standby não grava no Gist; as entradas esperam a liderança
+        if not entries or not is_leader():
+            continue
+
+        try:
+            ok = flush()
+        except Exception as e:
+            print(f"❌ Erro na outbox: {e}")
+            ok = False
+
+        if ok:
+            delay = OUTBOX_RETRY_MIN
+        else:
+            print(f"📮 Outbox: {len(entries)} pendentes, nova tentativa em {delay}s")
+            time.sleep(delay)
+            delay = min(delay * 2, OUTBOX_RETRY_MAX)
+            wakeup.set()
+
+
+load_outbox()
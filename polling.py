@@ -2,6 +2,8 @@ import requests
 import time
 from config import BOT_TOKEN
 from bot_commands import process_command
+from health import beat
+from leader import is_leader
 
 def polling_loop():
     """
@@ -12,6 +14,12 @@ def polling_loop():
     offset = 0
     
     while True:
+        # Standby não chama getUpdates (evita o conflito 409 com o líder)
+        if not is_leader():
+            beat("polling")
+            time.sleep(2)
+            continue
+
         try:
             url = f"https://api.telegram.org/bot{BOT_TOKEN}/getUpdates"
             params = {"offset": offset, "timeout": 10, "limit": 1}
@@ -20,6 +28,7 @@ def polling_loop():
             data = response.json()
             
             if data.get("ok"):
+                beat("polling")
                 updates = data.get("result", [])
                 for update in updates:
                     process_command(update)
@@ -0,0 +1,165 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+import zipfile
+from functools import wraps
+from tempfile import SpooledTemporaryFile
+from config import PROFILE, PROFILE_DIR
+import router
+
+# ---------------------------------------------------------
+# 🔹 PERFIL SOB DEMANDA
+# ---------------------------------------------------------
+# Alvos: "commands" (próximos N comandos), "pdf" (generate_pdf) e
+# "report" (generate_report). Desligado, nada é instalado no router e os
+# decorators fazem só uma consulta ao dict `remaining`.
+TARGETS = ("commands", "pdf", "report")
+
+remaining = {}
+trace_memory = {}
+# Evita perfis aninhados (ex: /pdf perfilado como comando e como pdf)
+running = False
+
+def enable(target, count, memory=False):
+    """Ativa o perfil de `target` para as próximas `count` chamadas."""
+    if target not in TARGETS:
+        raise ValueError(f"alvo inválido: {target}")
+
+    remaining[target] = count
+    trace_memory[target] = memory
+    if target == "commands" and profile_middleware not in router.middlewares:
+        router.use(profile_middleware)
+    print(f"🔬 Perfil ativado: {target} x{count}{' (memória)' if memory else ''}")
+
+
+def disable(target=None):
+    """Desativa um alvo (ou todos)."""
+    for name in [target] if target else list(remaining):
+        remaining.pop(name, None)
+        trace_memory.pop(name, None)
+    if "commands" not in remaining:
+        router.remove(profile_middleware)
+
+
+def run_profiled(target, label, func, *args, **kwargs):
+    """Executa func sob cProfile (e tracemalloc, se pedido) e grava o resultado."""
+    global running
+
+    memory = trace_memory.get(target, False)
+    remaining[target] -= 1
+    if remaining[target] <= 0:
+        disable(target)
+
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot() if memory else None
+
+    profile = cProfile.Profile()
+    running = True
+    start = time.perf_counter()
+    profile.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+        elapsed = time.perf_counter() - start
+        running = False
+
+        after = tracemalloc.take_snapshot() if memory else None
+        if started_tracing:
+            tracemalloc.stop()
+
+        try:
+            write_results(target, label, profile, elapsed, before, after)
+        except Exception as e:
+            print(f"❌ Erro ao gravar perfil: {e}")
+
+
+def write_results(target, label, profile, elapsed, before, after):
+    """Grava <alvo>_<data>_<label>.prof (pstats) e .txt (resumo legível)."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe_label = "".join(char if char.isalnum() else "_" for char in label).strip("_")
+    base = os.path.join(PROFILE_DIR, f"{target}_{time.strftime('%Y%m%d_%H%M%S')}_{safe_label}")
+
+    profile.dump_stats(f"{base}.prof")
+
+    text = io.StringIO()
+    text.write(f"{target} {label} — {elapsed * 1000:.1f} ms\n\n")
+    stats = pstats.Stats(profile, stream=text)
+    stats.sort_stats("cumulative").print_stats(40)
+
+    if before is not None and after is not None:
+        text.write("\nMemória (top 20 por linha):\n")
+        for stat in after.compare_to(before, "lineno")[:20]:
+            text.write(f"{stat}\n")
+
+    with open(f"{base}.txt", "w", encoding="utf-8") as f:
+        f.write(text.getvalue())
+    print(f"🔬 Perfil gravado: {base}.txt")
+
+
+def profiled(target):
+    """Decorator para generate_pdf/generate_report."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if target not in remaining or running:
+                return func(*args, **kwargs)
+            return run_profiled(target, func.__name__, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profile_middleware(ctx, call_next):
+    """Middleware instalado só enquanto o alvo "commands" está ativo."""
+    if "commands" not in remaining or running or ctx.name == "/profile":
+        return call_next(ctx)
+    return run_profiled("commands", ctx.name, call_next, ctx)
+
+
+# ---------------------------------------------------------
+# 🔹 RESULTADOS
+# ---------------------------------------------------------
+def list_results():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    return sorted(os.listdir(PROFILE_DIR))
+
+
+def zip_results():
+    """Compacta os resultados num arquivo temporário. Retorna (arquivo, quantidade)."""
+    files = list_results()
+    spool = SpooledTemporaryFile(max_size=1024 * 1024)
+    with zipfile.ZipFile(spool, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name in files:
+            archive.write(os.path.join(PROFILE_DIR, name), name)
+    spool.seek(0)
+    return spool, len(files)
+
+
+def clear_results():
+    files = list_results()
+    for name in files:
+        os.remove(os.path.join(PROFILE_DIR, name))
+    return len(files)
+
+
+def parse_spec(spec):
+    """Lê "alvo:N[:mem]" (ex: BOT_PROFILE=pdf:3:mem)."""
+    parts = spec.split(":")
+    target = parts[0].strip().lower()
+    count = int(parts[1]) if len(parts) > 1 and parts[1] else 1
+    memory = len(parts) > 2 and parts[2].strip().lower() == "mem"
+    return target, count, memory
+
+
+# Ativação por variável de ambiente (vários alvos separados por vírgula)
+for spec in filter(None, (PROFILE or "").split(",")):
+    try:
+        enable(*parse_spec(spec))
+    except ValueError as e:
+        print(f"❌ BOT_PROFILE inválido ({spec}): {e}")
@@ -4,10 +4,20 @@ from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
-from database import bot_data
-from utils import total_fuel_por_mes, total_fuel_geral
+from database import bot_data, RECORD_TYPES, data_lock, snapshot_data
+from utils import total_fuel_por_mes, total_fuel_geral, total_manu_geral
+from data_io import iter_records
+from archive import iter_archived
+from profiler import profiled
 
-def generate_pdf():
+# Registros por página no /hist
+HIST_PAGE_SIZE = 10
+
+# Limite de texto de uma mensagem do Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+@profiled("pdf")
+def generate_pdf(start=None, end=None):
     """
     Gera PDF completo com layout personalizado:
     - Título centralizado
@@ -16,8 +26,24 @@ def generate_pdf():
     - Abastecimentos
     - Manutenções
     - KM
+    Com período (start/end) as listas trazem só os registros do período;
+    segmentos arquivados só são lidos se cruzarem o período pedido.
+    Os totais vêm dos resumos, sem ler os segmentos.
+    data_lock fica só na cópia dos dados e nos totais: a leitura dos
+    segmentos (que pode ir ao Gist) e a montagem do PDF rodam sem a trava.
     """
     try:
+        with data_lock:
+            data = snapshot_data()
+            total_geral = total_fuel_geral()
+            total_manu = total_manu_geral()
+            # Gastos mensais (ano atual, inclusive arquivados)
+            gastos_mensais = total_fuel_por_mes()
+
+        records = {tipo: [] for tipo in RECORD_TYPES}
+        for tipo, record in iter_records(data, start, end, iter_archived):
+            records[tipo].append(record)
+
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=30, leftMargin=30, rightMargin=30)
         styles = getSampleStyleSheet()
@@ -54,14 +80,15 @@ def generate_pdf():
         # Data
         data_geracao = datetime.now().strftime("%d/%m/%Y às %H:%M")
         story.append(Paragraph(f"Gerado em: {data_geracao}", text_style))
+        if start or end:
+            inicio = start.strftime("%d/%m/%Y") if start else "início"
+            fim = end.strftime("%d/%m/%Y") if end else "hoje"
+            story.append(Paragraph(f"Período: {inicio} a {fim}", text_style))
         story.append(Spacer(1, 12))
 
         # --------------------------
         # GASTOS TOTAIS
         # --------------------------
-        total_geral = total_fuel_geral()
-        total_manu = sum(item.get('price', 0.0) for item in bot_data["manu"])
-
         story.append(Paragraph("■ GASTO TOTAL COMBUSTÍVEL", section_style))
         story.append(Paragraph(f"Total: R$ {total_geral:.2f}", text_style))
         story.append(Spacer(1, 6))
@@ -79,26 +106,11 @@ def generate_pdf():
             9: "Setembro", 10: "Outubro", 11: "Novembro", 12: "Dezembro"
         }
 
-        ano_atual = datetime.now().year
-
-        # Cálculo dos gastos mensais
-        gastos_mensais = {mes: 0.0 for mes in range(1, 13)}
-
-        for item in bot_data["fuel"]:
-            try:
-                data_str = item['date'].split(' às ')[0]
-                dia, mes, ano = map(int, data_str.split('/'))
-                ano_completo = 2000 + ano
-                if ano_completo == ano_atual:
-                    gastos_mensais[mes] += item['price']
-            except:
-                pass
-
         story.append(Paragraph("■ GASTO MENSAL COMBUSTÍVEL", section_style))
 
         for mes in range(1, 12 + 1):
             nome = meses_pt[mes]
-            total_mes = gastos_mensais[mes]
+            total_mes = gastos_mensais[nome]
             story.append(Paragraph(f"■ Período: ({nome})", text_style))
             story.append(Paragraph(f"Total: R$ {total_mes:.2f}", text_style))
             story.append(Spacer(1, 4))
@@ -110,8 +122,8 @@ def generate_pdf():
         # --------------------------
         story.append(Paragraph("■ Abastecimentos:", section_style))
 
-        if bot_data["fuel"]:
-            for i, item in enumerate(bot_data["fuel"], 1):
+        if records["fuel"]:
+            for i, item in enumerate(records["fuel"], 1):
                 story.append(Paragraph(
                     f"{i}. {item['liters']}L por R${item['price']:.2f} |{item['date']}|",
                     text_style
@@ -126,8 +138,8 @@ def generate_pdf():
         # --------------------------
         story.append(Paragraph("■ Manutenções:", section_style))
 
-        if bot_data["manu"]:
-            sorted_manu = sorted(bot_data["manu"], key=lambda x: x["km"])
+        if records["manu"]:
+            sorted_manu = sorted(records["manu"], key=lambda x: x["km"])
             for i, item in enumerate(sorted_manu, 1):
                 story.append(Paragraph(
                     f"{i}. {item['desc']} | R$ {item['price']:.2f} | {item['km']} Km |{item['date']}|",
@@ -143,8 +155,8 @@ def generate_pdf():
         # --------------------------
         story.append(Paragraph("■ KM:", section_style))
 
-        if bot_data["km"]:
-            sorted_km = sorted(bot_data["km"], key=lambda x: x["km"])
+        if records["km"]:
+            sorted_km = sorted(records["km"], key=lambda x: x["km"])
             for i, item in enumerate(sorted_km, 1):
                 story.append(Paragraph(
                     f"{i}. {item['km']} Km |{item['date']}|",
@@ -164,6 +176,7 @@ def generate_pdf():
         print(f"❌ Erro ao gerar PDF: {e}")
         return None
 
+@profiled("report")
 def generate_report():
     """
     Gera relatório resumido para o Telegram
@@ -175,7 +188,7 @@ def generate_report():
     # Cálculo de gastos
     total_mes = total_fuel_por_mes()
     total_geral = total_fuel_geral()
-    total_manu = sum(item.get('price', 0.0) for item in bot_data["manu"])
+    total_manu = total_manu_geral()
     
     now = datetime.now()
     meses_pt = {
@@ -186,14 +199,15 @@ def generate_report():
     nome_mes = meses_pt.get(now.month, now.strftime("%B"))
     
     # Seção de KM (últimos 4 registros) - ORDENADO POR KM
+    # Os números exibidos são as posições reais na lista (as mesmas do /del)
     msg += "📏 *KM (últimos 4):*\n"
     if bot_data["km"]:
         # Ordenar por KM e pegar últimos 4
-        sorted_km = sorted(bot_data["km"], key=lambda x: x["km"])
-        last_km = sorted_km[-4:]
-        start_index = len(bot_data["km"]) - len(last_km) + 1
-        for i, item in enumerate(last_km, start_index):
-            msg += f"{i}. {item['km']} Km |{item['date']}|\n"
+        km_list = bot_data["km"]
+        last_km = sorted(range(len(km_list)), key=lambda i: km_list[i]["km"])[-4:]
+        for i in last_km:
+            item = km_list[i]
+            msg += f"{i + 1}. {item['km']} Km |{item['date']}|\n"
     else:
         msg += "Nenhum registro\n"
 
@@ -201,12 +215,12 @@ def generate_report():
     msg += "\n🧰 *Manutenções (últimas 4):*\n"
     if bot_data["manu"]:
         # Ordenar por KM e pegar últimas 4
-        sorted_manu = sorted(bot_data["manu"], key=lambda x: x["km"])
-        last_manu = sorted_manu[-4:]
-        start_index = len(bot_data["manu"]) - len(last_manu) + 1
-        for i, item in enumerate(last_manu, start_index):
+        manu_list = bot_data["manu"]
+        last_manu = sorted(range(len(manu_list)), key=lambda i: manu_list[i]["km"])[-4:]
+        for i in last_manu:
+            item = manu_list[i]
             price = item.get('price', 0.0)
-            msg += f"{i}. {item['desc']} | R$ {price:.2f} | {item['km']} Km |{item['date']}|\n"
+            msg += f"{i + 1}. {item['desc']} | R$ {price:.2f} | {item['km']} Km |{item['date']}|\n"
     else:
         msg += "Nenhum registro\n"
     
@@ -223,7 +237,7 @@ def generate_report():
     # Seção de Gastos
     msg += f"\n💰 *GASTO MENSAL COMBUSTÍVEL* \n"
     msg += f"📅*Período:*({nome_mes})\n"
-    msg += f"Total: R$ {total_mes:.2f}\n\n"
+    msg += f"Total: R$ {total_mes.get(nome_mes, 0):.2f}\n\n"
     
     msg += f"💰 *GASTO TOTAL COMBUSTÍVEL*\n"
     msg += f"Total: R$ {total_geral:.2f}\n\n"
@@ -232,3 +246,59 @@ def generate_report():
     msg += f"Total: R$ {total_manu:.2f}"
 
     return msg
+
+
+# ---------------------------------------------------------
+# 🔹 HISTÓRICO PAGINADO (/hist)
+# ---------------------------------------------------------
+HIST_TITLES = {
+    "km": "📏 *KM*",
+    "fuel": "⛽ *Abastecimentos*",
+    "manu": "🧰 *Manutenções*",
+}
+
+def format_history_item(tipo, item):
+    """Linha de um registro no histórico (descrições longas são cortadas)."""
+    if tipo == "km":
+        return f"{item['km']} Km |{item['date']}|"
+    if tipo == "fuel":
+        return f"{item['liters']}L por R${item['price']:.2f} |{item['date']}|"
+    desc = item['desc'] if len(item['desc']) <= 60 else item['desc'][:57] + "..."
+    return f"{desc} | R$ {item.get('price', 0.0):.2f} | {item['km']} Km |{item['date']}|"
+
+
+def generate_history_page(tipo, page):
+    """
+    Gera uma página do histórico de `tipo` e o teclado de navegação.
+    A página 1 traz os registros mais recentes; cada página é um fatiamento
+    direto da lista salva, então o custo é proporcional ao tamanho da página.
+    Retorna (texto, reply_markup).
+    """
+    records = bot_data[tipo]
+    total = len(records)
+    total_pages = max(1, (total + HIST_PAGE_SIZE - 1) // HIST_PAGE_SIZE)
+    page = min(max(page, 1), total_pages)
+
+    end = total - (page - 1) * HIST_PAGE_SIZE
+    start = max(0, end - HIST_PAGE_SIZE)
+
+    msg = f"{HIST_TITLES[tipo]} — página {page}/{total_pages} ({total} registros)\n\n"
+    if total == 0:
+        msg += "Nenhum registro\n"
+    for i in range(end - 1, start - 1, -1):
+        msg += f"{i + 1}. {format_history_item(tipo, records[i])}\n"
+    msg = msg[:MAX_MESSAGE_LENGTH]
+
+    navigation = []
+    if page < total_pages:
+        navigation.append({"text": "⬅️ Anteriores", "callback_data": f"hist:{tipo}:{page + 1}"})
+    if page > 1:
+        navigation.append({"text": "Recentes ➡️", "callback_data": f"hist:{tipo}:{page - 1}"})
+
+    types_row = [
+        {"text": title.split("*")[1], "callback_data": f"hist:{other}:1"}
+        for other, title in HIST_TITLES.items() if other != tipo
+    ]
+
+    keyboard = [row for row in (navigation, types_row) if row]
+    return msg, {"inline_keyboard": keyboard}
@@ -0,0 +1,293 @@
+import time
+from config import BOT_USERNAME, ADMIN_CHAT_IDS
+from utils import send_message, answer_callback_query, get_bot_username
+
+# ---------------------------------------------------------
+# 🔹 REGISTRO DE COMANDOS
+# ---------------------------------------------------------
+# Tipo especial de argumento: junta todas as palavras que sobram
+# (ex: a descrição do /manu, entre os argumentos do início e do fim)
+TEXT = "text"
+
+REQUIRED = object()
+
+# Nível de admin para comandos que nunca ficam abertos, mesmo sem
+# ADMIN_CHAT_IDS configurado (admin=True libera todos nesse caso)
+STRICT = "strict"
+
+commands = {}
+callbacks = {}
+middlewares = []
+command_stats = {}
+chain = None
+
+
+class ArgumentError(Exception):
+    """Argumentos inválidos para o comando (responde com o uso correto)."""
+
+
+class Context:
+    """Dados de um comando recebido, compartilhados pela cadeia de middlewares."""
+
+    def __init__(self, update, message, chat_id, text, name, tokens, command, callback_query=None):
+        self.update = update
+        self.callback_query = callback_query
+        self.message = message
+        self.chat_id = chat_id
+        self.text = text
+        self.name = name
+        self.tokens = tokens
+        self.command = command
+        self.args = None
+
+    def reply(self, text):
+        return send_message(self.chat_id, text)
+
+
+class Command:
+    def __init__(self, name, handler, args, usage, admin):
+        self.name = name
+        self.handler = handler
+        self.usage = usage
+        self.admin = admin
+        self.parse = compile_args(args)
+
+
+def compile_args(spec):
+    """
+    Compila o esquema de argumentos uma única vez, no registro do comando.
+    spec é uma lista de (nome, conversor) ou (nome, conversor, padrão).
+    Um argumento TEXT consome o meio; os anteriores são lidos do início
+    e os posteriores do fim. Sem spec o handler recebe a lista de palavras.
+    """
+    if spec is None:
+        return lambda tokens: tokens
+
+    spec = [item if len(item) == 3 else (item[0], item[1], REQUIRED) for item in spec]
+    text_pos = next((i for i, item in enumerate(spec) if item[1] == TEXT), None)
+
+    if text_pos is None:
+        head, tail = spec, []
+    else:
+        head, tail = spec[:text_pos], spec[text_pos + 1:]
+        text_name = spec[text_pos][0]
+
+    required = sum(1 for item in head + tail if item[2] is REQUIRED)
+    if text_pos is not None:
+        required += 1
+
+    def parse(tokens):
+        if len(tokens) < required:
+            raise ArgumentError(f"esperado {required} argumentos, recebido {len(tokens)}")
+
+        args = {}
+        try:
+            for i, (name, conv, default) in enumerate(head):
+                args[name] = conv(tokens[i]) if i < len(tokens) else default
+            if text_pos is not None:
+                end = len(tokens) - len(tail)
+                for offset, (name, conv, default) in enumerate(tail):
+                    args[name] = conv(tokens[end + offset])
+                args[text_name] = " ".join(tokens[len(head):end])
+        except ValueError as e:
+            raise ArgumentError(str(e))
+        return args
+
+    return parse
+
+
+def command(name, args=None, usage=None, admin=False):
+    """
+    Decorator que registra um handler para o comando `name`.
+    admin=True restringe a ADMIN_CHAT_IDS (se configurado); admin=STRICT
+    restringe sempre, negando a todos enquanto a lista estiver vazia.
+    """
+    def decorator(handler):
+        commands[name] = Command(name, handler, args, usage, admin)
+        return handler
+    return decorator
+
+
+def callback(prefix, args=None):
+    """
+    Decorator que registra um handler para botões inline.
+    O callback_data tem o formato "prefixo:arg1:arg2..."
+    """
+    def decorator(handler):
+        callbacks[prefix] = Command(prefix, handler, args, None, False)
+        return handler
+    return decorator
+
+
+# ---------------------------------------------------------
+# 🔹 MIDDLEWARES
+# ---------------------------------------------------------
+def use(middleware):
+    """Adiciona um middleware no fim da cadeia (mais perto do handler)."""
+    global chain
+    middlewares.append(middleware)
+    chain = None
+
+
+def remove(middleware):
+    """Remove um middleware da cadeia, se presente."""
+    global chain
+    if middleware in middlewares:
+        middlewares.remove(middleware)
+        chain = None
+
+
+def build_chain():
+    """Monta a cadeia middleware -> ... -> handler (refeita só quando muda)."""
+    def call_handler(ctx):
+        ctx.args = ctx.command.parse(ctx.tokens[1:])
+        return ctx.command.handler(ctx)
+
+    call = call_handler
+    for middleware in reversed(middlewares):
+        call = (lambda mw, nxt: lambda ctx: mw(ctx, nxt))(middleware, call)
+    return call
+
+
+def error_middleware(ctx, call_next):
+    """Reporta erros de uso e falhas inesperadas ao usuário."""
+    try:
+        return call_next(ctx)
+    except ArgumentError:
+        if ctx.command.usage:
+            ctx.reply(ctx.command.usage)
+    except Exception as e:
+        print(f"❌ Erro no {ctx.name}: {e}")
+        if ctx.command.usage:
+            ctx.reply(ctx.command.usage)
+
+
+def timing_middleware(ctx, call_next):
+    """Acumula latência por comando (ver get_command_stats)."""
+    start = time.perf_counter()
+    ok = False
+    try:
+        result = call_next(ctx)
+        ok = True
+        return result
+    finally:
+        elapsed = time.perf_counter() - start
+        stats = command_stats.setdefault(ctx.name, {"count": 0, "errors": 0, "total": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["total"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+        if not ok:
+            stats["errors"] += 1
+
+
+def auth_middleware(ctx, call_next):
+    """Bloqueia comandos de administração para chats fora de ADMIN_CHAT_IDS."""
+    if ctx.command.admin and str(ctx.chat_id) not in ADMIN_CHAT_IDS:
+        # Lista vazia mantém o comportamento original para admin=True
+        # (ex: /delete, que pede senha), mas não para admin=STRICT
+        if ADMIN_CHAT_IDS or ctx.command.admin == STRICT:
+            if not ADMIN_CHAT_IDS:
+                print(f"⛔ {ctx.name} negado: ADMIN_CHAT_IDS não configurado")
+            ctx.reply("⛔ Comando restrito ao administrador")
+            return None
+    return call_next(ctx)
+
+
+use(error_middleware)
+use(timing_middleware)
+use(auth_middleware)
+
+
+def get_command_stats():
+    """Retorna latência por comando em milissegundos."""
+    return {
+        name: {
+            "count": stats["count"],
+            "errors": stats["errors"],
+            "avg_ms": round(stats["total"] / stats["count"] * 1000, 2) if stats["count"] else 0.0,
+            "max_ms": round(stats["max"] * 1000, 2),
+        }
+        for name, stats in command_stats.items()
+    }
+
+
+# ---------------------------------------------------------
+# 🔹 DESPACHO
+# ---------------------------------------------------------
+# @ do bot para ignorar comandos de outros bots em grupos (/start@outrobot).
+# Sem BOT_USERNAME configurado vem do getMe (ver load_bot_username)
+bot_username = BOT_USERNAME
+
+def load_bot_username():
+    """Descobre o @ do bot pelo getMe se BOT_USERNAME não foi configurado."""
+    global bot_username
+    if not bot_username:
+        bot_username = get_bot_username()
+        if bot_username:
+            print(f"🤖 Bot: @{bot_username}")
+    return bot_username
+
+
+def dispatch(update):
+    """
+    Encaminha o update para o handler do comando.
+    A busca é feita por igualdade exata do primeiro token (sem @NomeDoBot).
+    """
+    global chain
+
+    if "callback_query" in update:
+        return dispatch_callback(update)
+
+    message = update.get("message", {})
+    chat_id = message.get("chat", {}).get("id")
+    # Arquivos enviados com o comando na legenda (ex: /import)
+    text = message.get("text") or message.get("caption", "")
+
+    if not chat_id or not text or not text.startswith("/"):
+        return
+
+    tokens = text.split()
+    name, _, bot_name = tokens[0].partition("@")
+    if bot_name:
+        # Se o getMe falhou na inicialização, tenta de novo aqui
+        username = bot_username or load_bot_username()
+        if username and bot_name.lower() != username.lower():
+            return
+
+    name = name.lower()
+    cmd = commands.get(name)
+    if cmd is None:
+        return
+
+    print(f"📨 Comando: {text}")
+
+    if chain is None:
+        chain = build_chain()
+    return chain(Context(update, message, chat_id, text, name, tokens, cmd))
+
+
+def dispatch_callback(update):
+    """
+    Encaminha o clique num botão inline para o handler do prefixo.
+    O clique é sempre respondido no fim (mesmo com dados inválidos ou erro
+    no handler), senão o botão fica carregando no cliente.
+    """
+    global chain
+
+    callback_query = update["callback_query"]
+    message = callback_query.get("message", {})
+    chat_id = message.get("chat", {}).get("id")
+    data = callback_query.get("data", "")
+
+    try:
+        tokens = data.split(":")
+        cmd = callbacks.get(tokens[0])
+        if not chat_id or cmd is None:
+            return
+
+        if chain is None:
+            chain = build_chain()
+        return chain(Context(update, message, chat_id, data, tokens[0], tokens, cmd, callback_query))
+    finally:
+        if callback_query.get("id"):
+            answer_callback_query(callback_query["id"])
@@ -0,0 +1,104 @@
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from database import bot_data
+
+# ---------------------------------------------------------
+# 🔹 ÍNDICE INVERTIDO DAS MANUTENÇÕES
+# ---------------------------------------------------------
+# palavra normalizada -> ids dos registros (id() do dict em bot_data["manu"])
+index = {}
+records = {}
+# Palavras em ordem alfabética para busca por prefixo
+vocabulary = []
+# Lista indexada; se bot_data["manu"] for trocada (carga, merge, /delete)
+# o índice é refeito
+indexed_list = None
+
+def normalize(text):
+    """Minúsculas e sem acentos: "Óleo" -> "oleo"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def tokenize(text):
+    return re.findall(r"\w+", normalize(text))
+
+
+def add_record(record):
+    """Indexa uma manutenção recém-registrada."""
+    record_id = id(record)
+    records[record_id] = record
+    for token in set(tokenize(record.get("desc", ""))):
+        if token not in index:
+            index[token] = set()
+            insort(vocabulary, token)
+        index[token].add(record_id)
+
+
+def remove_record(record):
+    """Remove uma manutenção apagada do índice."""
+    record_id = id(record)
+    if records.pop(record_id, None) is None:
+        return
+    for token in set(tokenize(record.get("desc", ""))):
+        ids = index.get(token)
+        if ids is None:
+            continue
+        ids.discard(record_id)
+        if not ids:
+            del index[token]
+            del vocabulary[bisect_left(vocabulary, token)]
+
+
+def rebuild():
+    """Refaz o índice a partir de bot_data["manu"]."""
+    global indexed_list
+    index.clear()
+    records.clear()
+    for record in bot_data["manu"]:
+        record_id = id(record)
+        records[record_id] = record
+        for token in set(tokenize(record.get("desc", ""))):
+            index.setdefault(token, set()).add(record_id)
+    # Ordena o vocabulário uma vez só (insort por palavra seria quadrático)
+    vocabulary[:] = sorted(index)
+    indexed_list = bot_data["manu"]
+
+
+def ensure_index():
+    """Refaz o índice só se a lista de manutenções foi substituída ou divergiu."""
+    if indexed_list is not bot_data["manu"] or len(records) != len(bot_data["manu"]):
+        rebuild()
+
+
+def prefix_matches(term):
+    """Ids dos registros com alguma palavra que começa com `term`."""
+    matches = set()
+    position = bisect_left(vocabulary, term)
+    while position < len(vocabulary) and vocabulary[position].startswith(term):
+        matches |= index[vocabulary[position]]
+        position += 1
+    return matches
+
+
+def search(query):
+    """
+    Busca manutenções cujas descrições contenham todas as palavras da
+    consulta (cada uma como prefixo, sem acento e sem diferenciar maiúsculas).
+    Retorna os registros ordenados por KM.
+    """
+    ensure_index()
+
+    terms = tokenize(query)
+    if not terms:
+        return []
+
+    result = None
+    for term in terms:
+        ids = prefix_matches(term)
+        result = ids if result is None else result & ids
+        if not result:
+            return []
+
+    return sorted((records[record_id] for record_id in result), key=lambda record: record["km"])
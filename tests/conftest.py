@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+# Os módulos do bot leem a configuração e carregam o Gist no import:
+# sem GITHUB_TOKEN/GIST_ID a carga é pulada e nada sai para a rede
+TMP_DIR = tempfile.mkdtemp(prefix="bot_moto_tests_")
+os.environ["BOT_TOKEN"] = "0000000000:test"
+os.environ["GITHUB_TOKEN"] = ""
+os.environ["GIST_ID"] = ""
+os.environ["OUTBOX_PATH"] = os.path.join(TMP_DIR, "outbox.jsonl")
+os.environ["LEASE_FILE"] = os.path.join(TMP_DIR, "leader.lock")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """bot_data, outbox e revisão remota zerados a cada teste."""
+    import database
+    import outbox
+
+    database.bot_data.clear()
+    database.bot_data.update({"km": [], "fuel": [], "manu": [], "subscribers": [], "archive": []})
+    database.data_loaded = True
+    database.remote_rev = 0
+    outbox.entries.clear()
+    if os.path.exists(outbox.OUTBOX_PATH):
+        os.remove(outbox.OUTBOX_PATH)
+    yield
@@ -0,0 +1,127 @@
+import pytest
+import database
+import leader
+import outbox
+from leader import FileLeaseStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FileLeaseStore(str(tmp_path / "leader.lock"))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio controlado pelo teste (leader usa time.time)."""
+    now = [1000.0]
+    monkeypatch.setattr(leader.time, "time", lambda: now[0])
+    return now
+
+
+# ---------------------------------------------------------
+# 🔹 LEASE EM ARQUIVO
+# ---------------------------------------------------------
+def test_first_instance_acquires(store, clock):
+    lease = store.try_acquire("a", 30)
+    assert lease == {"holder": "a", "expires_at": 1030.0}
+
+
+def test_second_instance_waits_while_lease_valid(store, clock):
+    store.try_acquire("a", 30)
+    clock[0] += 29
+
+    lease = store.try_acquire("b", 30)
+    assert lease["holder"] == "a"
+
+
+def test_holder_renews(store, clock):
+    store.try_acquire("a", 30)
+    clock[0] += 20
+
+    lease = store.try_acquire("a", 30)
+    assert lease == {"holder": "a", "expires_at": 1050.0}
+
+
+def test_takeover_after_expiry(store, clock):
+    store.try_acquire("a", 30)
+    clock[0] += 31
+
+    assert store.try_acquire("b", 30)["holder"] == "b"
+    # O antigo líder não retoma enquanto o lease de b vale
+    assert store.try_acquire("a", 30)["holder"] == "b"
+
+
+def test_is_leader_requires_valid_lease(monkeypatch, clock):
+    monkeypatch.setattr(leader, "COORDINATION_MODE", "file")
+    monkeypatch.setattr(leader, "role", "leader")
+    monkeypatch.setattr(leader, "lease_expires_at", 1010.0)
+    assert leader.is_leader()
+
+    # Renovação falhou: para sozinho quando o lease vence
+    clock[0] = 1011.0
+    assert not leader.is_leader()
+
+
+def test_gist_lease_uses_its_own_gist(monkeypatch, clock):
+    files = {}
+    monkeypatch.setattr(leader, "read_gist_file", lambda name, gist_id: files.get((gist_id, name)))
+    monkeypatch.setattr(leader, "write_gist_file",
+                        lambda name, content, gist_id: files.__setitem__((gist_id, name), content) or {"filename": name})
+    monkeypatch.setattr(leader.time, "sleep", lambda seconds: None)
+
+    lease = leader.GistLeaseStore("lease-gist").try_acquire("a", 120)
+
+    assert lease == {"holder": "a", "expires_at": 1120.0}
+    assert list(files) == [("lease-gist", "leader.json")]
+
+
+# ---------------------------------------------------------
+# 🔹 ELEIÇÃO
+# ---------------------------------------------------------
+class StopElection(Exception):
+    pass
+
+
+def run_election_round(monkeypatch, store):
+    """Roda uma volta do leader_elector (o sleep do fim interrompe o laço)."""
+    def stop(seconds):
+        raise StopElection()
+
+    monkeypatch.setattr(leader, "COORDINATION_MODE", "file")
+    monkeypatch.setattr(leader, "get_lease_store", lambda: store)
+    monkeypatch.setattr(leader.time, "sleep", stop)
+    with pytest.raises(StopElection):
+        leader.leader_elector()
+
+
+def test_new_leader_reloads_and_reconciles(monkeypatch, store, clock):
+    monkeypatch.setattr(leader, "INSTANCE_ID", "b")
+    monkeypatch.setattr(leader, "role", "standby")
+
+    # Alteração feita enquanto esta instância era standby
+    record = {"liters": 5.0, "price": 30.0, "date": "01/01/26 às 10:00"}
+    database.bot_data["fuel"].append(record)
+    outbox.record_add("fuel", record)
+
+    remote = {"km": [{"km": 2000, "date": "01/01/26 às 09:00"}], "fuel": [], "manu": []}
+    monkeypatch.setattr(leader, "fetch_remote_data", lambda: (remote, 7))
+
+    run_election_round(monkeypatch, store)
+
+    assert leader.role == "leader"
+    assert leader.is_leader()
+    assert database.bot_data["km"] == remote["km"]
+    assert [item["id"] for item in database.bot_data["fuel"]] == [record["id"]]
+    assert database.remote_rev == 7
+
+
+def test_standby_while_other_instance_holds_lease(monkeypatch, store, clock):
+    store.try_acquire("a", 30)
+    monkeypatch.setattr(leader, "INSTANCE_ID", "b")
+    monkeypatch.setattr(leader, "role", "standby")
+    monkeypatch.setattr(leader, "fetch_remote_data", lambda: pytest.fail("standby não recarrega"))
+
+    run_election_round(monkeypatch, store)
+
+    assert leader.role == "standby"
+    assert not leader.is_leader()
@@ -0,0 +1,182 @@
+import pytest
+import database
+import outbox
+from database import ConflictError
+
+
+def fuel(liters=10.0, price=50.0):
+    return {"liters": liters, "price": price, "date": "01/01/26 às 10:00"}
+
+
+def empty_data():
+    return {"km": [], "fuel": [], "manu": [], "subscribers": [], "archive": []}
+
+
+# ---------------------------------------------------------
+# 🔹 REAPLICAÇÃO
+# ---------------------------------------------------------
+def test_replay_keeps_identical_records():
+    # Dois /fuel iguais no mesmo minuto são dois registros confirmados
+    outbox.record_add("fuel", fuel())
+    outbox.record_add("fuel", fuel())
+
+    data = empty_data()
+    outbox.reconcile(data)
+
+    assert len(data["fuel"]) == 2
+
+
+def test_replay_is_idempotent():
+    first, second = fuel(), fuel()
+    outbox.record_add("fuel", first)
+    outbox.record_add("fuel", second)
+
+    # O Gist já tem o primeiro (salvo antes da queda)
+    data = empty_data()
+    data["fuel"].append(dict(first))
+    outbox.reconcile(data)
+    outbox.reconcile(data)
+
+    assert [record["id"] for record in data["fuel"]] == [first["id"], second["id"]]
+
+
+def test_replay_remove_matches_by_id():
+    first, second = fuel(), fuel()
+    outbox.record_add("fuel", first)
+    outbox.record_add("fuel", second)
+    outbox.record_remove("fuel", second)
+
+    data = empty_data()
+    outbox.reconcile(data)
+
+    assert [record["id"] for record in data["fuel"]] == [first["id"]]
+
+
+def test_replay_subscribers_by_value():
+    outbox.record_add("subscribers", 42)
+    outbox.record_add("subscribers", 42)
+
+    data = empty_data()
+    outbox.reconcile(data)
+
+    assert data["subscribers"] == [42]
+
+
+# ---------------------------------------------------------
+# 🔹 ARQUIVO
+# ---------------------------------------------------------
+def test_load_outbox_restores_entries():
+    outbox.record_add("fuel", fuel())
+    outbox.record_clear()
+    saved = list(outbox.entries)
+
+    outbox.entries.clear()
+    outbox.load_outbox()
+
+    assert outbox.entries == saved
+
+
+def test_load_outbox_drops_torn_line():
+    outbox.record_add("fuel", fuel())
+    with open(outbox.OUTBOX_PATH, "a", encoding="utf-8") as f:
+        f.write('{"id": "interrompida", "op": "ad')
+
+    outbox.entries.clear()
+    outbox.load_outbox()
+    assert len(outbox.entries) == 1
+
+    # O próximo append começa numa linha nova
+    outbox.record_add("fuel", fuel())
+    outbox.entries.clear()
+    outbox.load_outbox()
+    assert len(outbox.entries) == 2
+
+
+# ---------------------------------------------------------
+# 🔹 FLUSH E CONFLITOS
+# ---------------------------------------------------------
+def test_flush_clears_entries_after_save(monkeypatch):
+    saved = []
+    monkeypatch.setattr(outbox, "save_to_gist", lambda data, check_version: saved.append(data) or True)
+
+    record = fuel()
+    database.bot_data["fuel"].append(record)
+    outbox.record_add("fuel", record)
+
+    assert outbox.flush()
+    assert saved[0]["fuel"] == [record]
+    assert outbox.entries == []
+
+    outbox.load_outbox()
+    assert outbox.entries == []
+
+
+def test_flush_keeps_entries_when_save_fails(monkeypatch):
+    monkeypatch.setattr(outbox, "save_to_gist", lambda data, check_version: False)
+
+    record = fuel()
+    database.bot_data["fuel"].append(record)
+    outbox.record_add("fuel", record)
+
+    assert not outbox.flush()
+    assert len(outbox.entries) == 1
+
+
+def test_flush_merges_pending_entries_on_conflict(monkeypatch):
+    monkeypatch.setattr(outbox, "COORDINATION_MODE", "file")
+
+    # Outra instância gravou um KM novo desde a última leitura (revisão 5)
+    remote = empty_data()
+    remote["km"].append({"km": 1500, "date": "02/01/26 às 09:00"})
+    saved = []
+
+    def save(data, check_version):
+        assert check_version
+        if not saved:
+            saved.append(None)
+            raise ConflictError(remote, 5)
+        saved.append(data)
+        return True
+
+    monkeypatch.setattr(outbox, "save_to_gist", save)
+
+    record = fuel()
+    database.bot_data["fuel"].append(record)
+    outbox.record_add("fuel", record)
+
+    assert outbox.flush()
+    assert saved[1]["km"] == remote["km"]
+    assert [item["id"] for item in saved[1]["fuel"]] == [record["id"]]
+    assert database.bot_data["km"] == remote["km"]
+    assert database.remote_rev == 5
+    assert outbox.entries == []
+
+
+def test_flush_loads_before_saving_when_never_loaded(monkeypatch):
+    database.data_loaded = False
+    remote = empty_data()
+    remote["km"].append({"km": 900, "date": "01/01/26 às 08:00"})
+    monkeypatch.setattr(outbox, "fetch_remote_data", lambda: (remote, 3))
+    saved = []
+    monkeypatch.setattr(outbox, "save_to_gist", lambda data, check_version: saved.append(data) or True)
+
+    record = fuel()
+    database.bot_data["fuel"].append(record)
+    outbox.record_add("fuel", record)
+
+    assert outbox.flush()
+    assert saved[0]["km"] == remote["km"]
+    assert [item["id"] for item in saved[0]["fuel"]] == [record["id"]]
+    assert database.remote_rev == 3
+
+
+def test_flush_gives_up_when_gist_unavailable(monkeypatch):
+    database.data_loaded = False
+    monkeypatch.setattr(outbox, "fetch_remote_data", lambda: None)
+    monkeypatch.setattr(outbox, "save_to_gist",
+                        lambda data, check_version: pytest.fail("não deveria salvar com os dados não carregados"))
+
+    outbox.record_add("fuel", fuel())
+
+    assert not outbox.flush()
+    assert len(outbox.entries) == 1
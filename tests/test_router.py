@@ -0,0 +1,32 @@
+import pytest
+from router import compile_args, ArgumentError, TEXT
+
+
+def test_no_spec_passes_tokens():
+    assert compile_args(None)(["a", "b"]) == ["a", "b"]
+
+
+def test_converts_and_applies_defaults():
+    parse = compile_args([("tipo", str), ("index", int, None)])
+    assert parse(["km", "3"]) == {"tipo": "km", "index": 3}
+    assert parse(["km"]) == {"tipo": "km", "index": None}
+
+
+def test_missing_required_argument():
+    with pytest.raises(ArgumentError):
+        compile_args([("km", int)])([])
+
+
+def test_invalid_value():
+    with pytest.raises(ArgumentError):
+        compile_args([("km", int)])(["abc"])
+
+
+def test_text_takes_the_middle():
+    parse = compile_args([("desc", TEXT), ("price", float), ("km", int)])
+    assert parse(["Troca", "de", "óleo", "50", "15000"]) == {"desc": "Troca de óleo", "price": 50.0, "km": 15000}
+
+
+def test_text_requires_at_least_one_word():
+    with pytest.raises(ArgumentError):
+        compile_args([("desc", TEXT), ("price", float), ("km", int)])(["50", "15000"])
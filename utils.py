@@ -1,5 +1,6 @@
 import requests
 import pytz
+import uuid
 from datetime import datetime
 from config import BOT_TOKEN
 from database import bot_data
@@ -7,10 +8,12 @@ from database import bot_data
 # ---------------------------------------------------------
 # 🔹 ENVIO DE MENSAGENS
 # ---------------------------------------------------------
-def send_message(chat_id, text):
-    """Envia mensagem simples usando Markdown."""
+def send_message(chat_id, text, reply_markup=None):
+    """Envia mensagem simples usando Markdown (opcionalmente com teclado inline)."""
     url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
     data = {"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}
+    if reply_markup:
+        data["reply_markup"] = reply_markup
 
     try:
         response = requests.post(url, json=data, timeout=5)
@@ -20,20 +23,126 @@ def send_message(chat_id, text):
         return False
 
 
-def send_document(chat_id, document, filename):
-    """Envia PDF para o chat."""
+def get_bot_username():
+    """Retorna o @ do bot (sem @) consultando o getMe, ou None se falhar."""
+    url = f"https://api.telegram.org/bot{BOT_TOKEN}/getMe"
+
+    try:
+        response = requests.get(url, timeout=5)
+        return response.json().get("result", {}).get("username")
+    except Exception as e:
+        print(f"❌ Erro ao consultar getMe: {e}")
+        return None
+
+
+def edit_message_text(chat_id, message_id, text, reply_markup=None):
+    """Edita o texto (e o teclado inline) de uma mensagem já enviada."""
+    url = f"https://api.telegram.org/bot{BOT_TOKEN}/editMessageText"
+    data = {"chat_id": chat_id, "message_id": message_id, "text": text, "parse_mode": "Markdown"}
+    if reply_markup:
+        data["reply_markup"] = reply_markup
+
+    try:
+        response = requests.post(url, json=data, timeout=5)
+        return response.status_code == 200
+    except Exception as e:
+        print(f"❌ Erro ao editar mensagem: {e}")
+        return False
+
+
+def answer_callback_query(callback_query_id, text=None):
+    """Confirma o clique num botão inline (remove o "carregando" do cliente)."""
+    url = f"https://api.telegram.org/bot{BOT_TOKEN}/answerCallbackQuery"
+    data = {"callback_query_id": callback_query_id}
+    if text:
+        data["text"] = text
+
+    try:
+        response = requests.post(url, json=data, timeout=5)
+        return response.status_code == 200
+    except Exception as e:
+        print(f"❌ Erro ao responder callback: {e}")
+        return False
+
+
+class MultipartStream:
+    """
+    Corpo multipart/form-data que lê o arquivo em blocos durante o envio.
+    Como informa o tamanho (__len__), o requests manda Content-Length e
+    transmite o corpo sem carregá-lo inteiro na memória.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fields, file_field, fileobj, filename, mime_type):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+        head = ""
+        for name, value in fields.items():
+            head += f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f'Content-Type: {mime_type}\r\n\r\n'
+        )
+        self.head = head.encode("utf-8")
+        self.tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+        self.fileobj = fileobj
+        fileobj.seek(0, 2)
+        self.size = fileobj.tell()
+        fileobj.seek(0)
+
+    def __len__(self):
+        return len(self.head) + self.size + len(self.tail)
+
+    def __iter__(self):
+        yield self.head
+        while True:
+            chunk = self.fileobj.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        yield self.tail
+
+
+def send_document(chat_id, document, filename, mime_type='application/pdf'):
+    """Envia arquivo (PDF por padrão) para o chat, lendo-o em blocos."""
     url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendDocument"
-    files = {'document': (filename, document, 'application/pdf')}
-    data = {'chat_id': chat_id}
 
     try:
-        response = requests.post(url, files=files, data=data, timeout=30)
+        body = MultipartStream({'chat_id': chat_id}, 'document', document, filename, mime_type)
+        headers = {'Content-Type': body.content_type}
+        response = requests.post(url, data=body, headers=headers, timeout=60)
         return response.status_code == 200
     except Exception as e:
-        print(f"❌ Erro ao enviar PDF: {e}")
+        print(f"❌ Erro ao enviar arquivo: {e}")
         return False
 
 
+def download_file(file_id):
+    """
+    Abre o download de um arquivo enviado ao bot (document, foto...).
+    Retorna a resposta em modo stream ou None se falhar.
+    """
+    try:
+        url = f"https://api.telegram.org/bot{BOT_TOKEN}/getFile"
+        response = requests.get(url, params={"file_id": file_id}, timeout=10)
+        file_path = response.json().get("result", {}).get("file_path")
+        if not file_path:
+            print(f"❌ Arquivo não encontrado: {response.text}")
+            return None
+
+        url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}"
+        response = requests.get(url, stream=True, timeout=30)
+        if response.status_code != 200:
+            print(f"❌ Erro ao baixar arquivo: {response.status_code}")
+            return None
+        return response
+    except Exception as e:
+        print(f"❌ Erro ao baixar arquivo: {e}")
+        return None
+
+
 # ---------------------------------------------------------
 # 🔹 FORMATAÇÃO DE DATA
 # ---------------------------------------------------------
@@ -44,6 +153,28 @@ def format_date():
     return f"{now.day:02d}/{now.month:02d}/{str(now.year)[-2:]} às {now.hour:02d}:{now.minute:02d}"
 
 
+DATE_FORMATS = ["%d/%m/%y às %H:%M", "%d/%m/%y", "%d/%m/%Y às %H:%M", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%Y-%m-%d %H:%M", "%Y-%m-%d"]
+
+def parse_record_date(date_str):
+    """
+    Converte a data de um registro (ex: "18/02/25 às 14:30") em datetime.
+    Também aceita DD/MM/AAAA e AAAA-MM-DD, com ou sem hora.
+    Retorna None se não reconhecer o formato.
+    """
+    date_str = (date_str or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def format_record_date(dt):
+    """Formata um datetime no padrão dos registros: DD/MM/AA às HH:MM."""
+    return f"{dt.day:02d}/{dt.month:02d}/{str(dt.year)[-2:]} às {dt.hour:02d}:{dt.minute:02d}"
+
+
 # ---------------------------------------------------------
 # 🔹 KM E MANUTENÇÃO
 # ---------------------------------------------------------
@@ -62,6 +193,11 @@ def get_last_oil_change():
         desc_lower = manu['desc'].lower()
         if any(keyword.lower() in desc_lower for keyword in oil_keywords):
             return manu['km']
+
+    # Nenhuma troca nos registros em memória: usar os resumos do arquivo
+    for segment in reversed(archived_segments("manu")):
+        if segment.get("last_oil_km"):
+            return segment["last_oil_km"]
     return 0
 
 
@@ -120,9 +256,43 @@ def total_fuel_por_mes():
         except:
             continue
 
+    for mes, total in archived_by_month("fuel", ano_atual).items():
+        totais[meses_nomes[mes - 1]] += total
+
     return totais
 
 
 def total_fuel_geral():
-    """Soma tudo de combustível já registrado."""
-    return sum(item['price'] for item in bot_data["fuel"])
+    """Soma tudo de combustível já registrado (inclusive arquivado)."""
+    return sum(item['price'] for item in bot_data["fuel"]) + archived_total("fuel")
+
+
+def total_manu_geral():
+    """Soma tudo de manutenção já registrado (inclusive arquivado)."""
+    return sum(item.get('price', 0.0) for item in bot_data["manu"]) + archived_total("manu")
+
+
+# ---------------------------------------------------------
+# 🔹 RESUMOS DOS REGISTROS ARQUIVADOS
+# ---------------------------------------------------------
+# Os registros antigos ficam em segmentos comprimidos (ver archive.py);
+# em bot_data["archive"] fica só o resumo de cada segmento, suficiente
+# para os totais sem precisar carregar os segmentos.
+def archived_segments(tipo):
+    """Resumos dos segmentos de `tipo`, do mais antigo para o mais novo."""
+    return [segment for segment in bot_data.get("archive", []) if segment["type"] == tipo]
+
+
+def archived_total(tipo):
+    return sum(segment.get("total_price", 0.0) for segment in archived_segments(tipo))
+
+
+def archived_by_month(tipo, year):
+    """Retorna {mês: total} dos segmentos de `tipo` no ano informado."""
+    totais = {}
+    for segment in archived_segments(tipo):
+        for month_key, total in segment.get("by_month", {}).items():
+            ano, mes = map(int, month_key.split("-"))
+            if ano == year:
+                totais[mes] = totais.get(mes, 0.0) + total
+    return totais